@@ -0,0 +1,125 @@
+"""
+CustomCmdMsg PluginAction 回复链路压测
+
+示例：
+    python benchmarks/bench_customcmdmsg.py --events 20000 --commands 200 --latency-ms 5 --async
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import tracemalloc
+
+from common import format_ms, percentiles, setup_path
+
+setup_path()
+
+from app.core.event import Event  # noqa: E402
+from app.plugins import _PluginBase  # noqa: E402
+from app.schemas.types import EventType, MessageChannel  # noqa: E402
+from customcmdmsg import CustomCmdMsg  # noqa: E402
+
+
+def build_config(args) -> dict:
+    table = [{"cmd": f"/bench{i}", "desc": f"压测{i}", "title": f"标题{i}",
+              "text": "用户{user}，渠道{channel}，第{count}次" if i % 2 else f"静态文本{i}"}
+             for i in range(args.commands)]
+    return {
+        "enabled": True,
+        "msg_title": "自定义回复",
+        "msg_text": "你好 {user}",
+        "cmd_table": json.dumps(table, ensure_ascii=False),
+        "async_send": args.async_send,
+        "send_workers": args.workers,
+        "send_queue_size": args.queue_size,
+        "send_overflow": "block",
+        "send_block_timeout": 60,
+        "dedupe_window": args.dedupe_window,
+        "user_rate": 0,
+        "global_rate": 0,
+    }
+
+
+def build_events(args) -> list:
+    rnd = random.Random(args.seed)
+    actions = ["custom_cmdmsg"] + [f"custom_cmdmsg_bench{i}" for i in range(args.commands)]
+    channels = list(MessageChannel)
+    events = []
+    for _ in range(args.events):
+        if rnd.random() < args.match_ratio:
+            action = rnd.choice(actions)
+        else:
+            # 其他插件的命令
+            action = f"other_plugin_{rnd.randrange(50)}"
+        events.append(Event(EventType.PluginAction, {
+            "action": action,
+            "user": f"user{rnd.randrange(args.users)}",
+            "channel": rnd.choice(channels),
+            "source": "bench",
+        }))
+    return events
+
+
+def run(args):
+    _PluginBase.post_latency = args.latency_ms / 1000
+    plugin = CustomCmdMsg()
+    plugin.init_plugin(build_config(args))
+    events = build_events(args)
+
+    chunks = [events[i::args.threads] for i in range(args.threads)]
+    samples = [[] for _ in range(args.threads)]
+
+    def drive(index: int):
+        lat = samples[index]
+        handler = plugin.custom_cmd_msg
+        for event in chunks[index]:
+            start = time.perf_counter()
+            handler(event)
+            lat.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    dispatched = time.perf_counter() - started
+    dispatcher = plugin._dispatcher
+    plugin.stop_service()
+    finished = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    handler_lat = [x for lat in samples for x in lat]
+    stats = plugin.get_stats()
+    total = stats.get("total") or {}
+    print(f"events={args.events} commands={args.commands + 1} match_ratio={args.match_ratio} "
+          f"threads={args.threads} async={args.async_send} post_latency={args.latency_ms}ms")
+    print(f"dispatch: {args.events / dispatched:,.0f} events/s ({dispatched:.3f}s)")
+    print(f"complete: {plugin.sent / finished if finished else 0:,.0f} replies/s ({finished:.3f}s, sent={plugin.sent})")
+    print(f"handler latency: {format_ms(percentiles(handler_lat))}")
+    print(f"reply latency: p50={total.get('p50_ms')}ms p95={total.get('p95_ms')}ms p99={total.get('p99_ms')}ms")
+    print(f"suppressed: {stats.get('suppressed')}  queue: {dispatcher.stats if dispatcher else None}")
+    print(f"peak memory: {peak / 1024:.1f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CustomCmdMsg 回复链路压测")
+    parser.add_argument("--events", type=int, default=10000, help="事件数量")
+    parser.add_argument("--commands", type=int, default=100, help="命令表中的命令数量")
+    parser.add_argument("--match-ratio", type=float, default=0.5, help="属于本插件命令的事件比例")
+    parser.add_argument("--users", type=int, default=500, help="用户数量")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="模拟 post_message 耗时（毫秒）")
+    parser.add_argument("--threads", type=int, default=1, help="并发投递事件的线程数")
+    parser.add_argument("--async", dest="async_send", action="store_true", help="开启异步回复")
+    parser.add_argument("--workers", type=int, default=4, help="异步回复线程数")
+    parser.add_argument("--queue-size", type=int, default=1000, help="异步回复队列长度")
+    parser.add_argument("--dedupe-window", type=float, default=0, help="重复事件过滤窗口（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
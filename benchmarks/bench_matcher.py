@@ -0,0 +1,111 @@
+"""
+自动回复匹配压测：对比合并匹配器（关键词自动机 + 合并正则）与逐条匹配在不同规则数量下的单条消息匹配耗时
+
+示例：
+    python benchmarks/bench_matcher.py --rules 10 100 1000 5000 --messages 2000
+    python benchmarks/bench_matcher.py --regex-ratio 0.5
+"""
+import argparse
+import random
+import re
+import time
+
+from common import format_ms, percentiles, setup_path
+
+setup_path()
+
+from customcmdmsg.matcher import MatchRule, ReplyMatcher  # noqa: E402
+
+WORDS = ["电影", "剧集", "订阅", "下载", "帮助", "movie", "show", "search", "status", "排行", "推荐", "更新"]
+
+
+class NaiveMatcher:
+    """
+    逐条匹配：按优先级遍历所有规则，返回第一个匹配的规则
+    """
+
+    def __init__(self, rules):
+        ordered = sorted(enumerate(rules), key=lambda item: (-item[1].priority, item[0]))
+        self._rules = []
+        for _, rule in ordered:
+            if rule.regex:
+                compiled = re.compile(rule.pattern, re.IGNORECASE if rule.ignore_case else 0)
+                self._rules.append((compiled.search, rule.value))
+            elif rule.ignore_case:
+                pattern = rule.pattern.casefold()
+                self._rules.append((lambda text, p=pattern: p in text.casefold(), rule.value))
+            else:
+                self._rules.append((lambda text, p=rule.pattern: p in text, rule.value))
+
+    def match(self, text):
+        for test, value in self._rules:
+            if test(text):
+                return value
+        return None
+
+
+def build_rules(count: int, regex_ratio: float, rng: random.Random):
+    rules = []
+    for i in range(count):
+        word = f"{rng.choice(WORDS)}{i}"
+        if rng.random() < regex_ratio:
+            rules.append(MatchRule(pattern=rf"{word}\s*\d+", value=i, regex=True, priority=rng.randint(0, 3)))
+        else:
+            rules.append(MatchRule(pattern=word, value=i, priority=rng.randint(0, 3),
+                                   ignore_case=rng.random() < 0.8))
+    return rules
+
+
+def build_messages(count: int, rules, hit_ratio: float, rng: random.Random):
+    messages = []
+    for _ in range(count):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        if rng.random() < hit_ratio:
+            rule = rng.choice(rules)
+            word = rule.pattern.split("\\")[0]
+            text += f" {word} 42" if rule.regex else f" {word}"
+        messages.append(text)
+    return messages
+
+
+def measure(matcher, messages):
+    samples = []
+    for text in messages:
+        start = time.perf_counter()
+        matcher.match(text)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自动回复匹配耗时")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 1000, 5000], help="规则数量")
+    parser.add_argument("--messages", type=int, default=2000, help="每组测试的消息数")
+    parser.add_argument("--regex-ratio", type=float, default=0.2, help="正则规则占比")
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="能匹配到规则的消息占比")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for count in args.rules:
+        rng = random.Random(args.seed)
+        rules = build_rules(count, args.regex_ratio, rng)
+        messages = build_messages(args.messages, rules, args.hit_ratio, rng)
+
+        start = time.perf_counter()
+        combined = ReplyMatcher(rules)
+        compile_time = time.perf_counter() - start
+        naive = NaiveMatcher(rules)
+
+        mismatched = sum(combined.match(text) != naive.match(text) for text in messages)
+        combined_samples = measure(combined, messages)
+        naive_samples = measure(naive, messages)
+        speedup = sum(naive_samples) / max(sum(combined_samples), 1e-12)
+
+        print(f"[rules={count}] compile={compile_time * 1000:.3f}ms  mismatched={mismatched}")
+        print(f"  combined: {format_ms(percentiles(combined_samples))}")
+        print(f"  naive:    {format_ms(percentiles(naive_samples))}")
+        print(f"  speedup:  {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
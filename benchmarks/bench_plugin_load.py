@@ -0,0 +1,109 @@
+"""
+插件加载耗时压测：模块导入耗时（每次在新进程中导入）、init_plugin 与 get_form/get_page 渲染耗时
+
+示例：
+    python benchmarks/bench_plugin_load.py --imports 20 --renders 2000
+    MP_BENCH_HEAVY_IMPORT_MS=50 python benchmarks/bench_plugin_load.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from common import BENCH_DIR, format_ms, percentiles, setup_path
+
+setup_path()
+
+from app.core.config import settings  # noqa: E402
+
+# 较重或可选的依赖，插件导入后仍未加载的视为已延迟导入
+HEAVY_MODULES = ("app.agent.prompt", "app.utils.http", "concurrent.futures", "ctypes")
+
+PLUGINS = {
+    "customcmdmsg": "CustomCmdMsg",
+    "customagentprompt": "CustomAgentPrompt",
+}
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+sys.path[:0] = {paths!r}
+before = set(sys.modules)
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules and m not in before]}}))
+"""
+
+
+def measure_import(module: str, rounds: int) -> dict:
+    """
+    在新进程中导入插件模块，统计导入耗时及导入时加载的较重依赖
+    """
+    script = _IMPORT_SCRIPT.format(paths=sys.path[:2], module=module, heavy=HEAVY_MODULES)
+    samples, loaded = [], set()
+    for _ in range(rounds):
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                check=True, cwd=BENCH_DIR).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["elapsed"])
+        loaded.update(result["loaded"])
+    return {"samples": samples, "loaded": sorted(loaded)}
+
+
+def build_config(module: str) -> dict:
+    if module == "customcmdmsg":
+        table = [{"cmd": f"/bench{i}", "title": f"标题{i}", "text": f"文本{i}"} for i in range(50)]
+        return {"enabled": True, "msg_title": "自定义回复", "cmd_table": json.dumps(table, ensure_ascii=False)}
+    prompt = "\n\n".join(f"## 章节{i}\n" + "提示词内容 prompt text. " * 40 for i in range(20))
+    profiles = [{"name": f"方案{i}", "prompt": prompt[: 2000 * (i + 1)]} for i in range(3)]
+    return {"auto_replace": False, "prompt_custom": prompt, "compact_enabled": True,
+            "profiles": json.dumps(profiles, ensure_ascii=False)}
+
+
+def measure_render(module: str, class_name: str, rounds: int) -> dict:
+    """
+    统计 init_plugin 与 get_form、get_page 的耗时
+    """
+    prompt_dir = settings.ROOT_PATH / "app" / "agent" / "prompt"
+    prompt_dir.mkdir(parents=True, exist_ok=True)
+    (prompt_dir / "Agent Prompt.txt").write_text("默认提示词", encoding="utf-8")
+
+    plugin = getattr(__import__(module), class_name)()
+    start = time.perf_counter()
+    plugin.init_plugin(build_config(module))
+    init = time.perf_counter() - start
+
+    result = {"init": init}
+    for name in ("get_form", "get_page"):
+        method = getattr(plugin, name)
+        samples = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            method()
+            samples.append(time.perf_counter() - start)
+        result[name] = samples
+    plugin.stop_service()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="插件加载与配置页面渲染耗时")
+    parser.add_argument("--imports", type=int, default=10, help="每个插件的导入次数（每次新进程）")
+    parser.add_argument("--renders", type=int, default=1000, help="get_form/get_page 调用次数")
+    parser.add_argument("--plugin", choices=sorted(PLUGINS), action="append", help="只测试指定插件")
+    args = parser.parse_args()
+
+    for module in args.plugin or PLUGINS:
+        imported = measure_import(module, args.imports)
+        rendered = measure_render(module, PLUGINS[module], args.renders)
+        print(f"[{module}]")
+        print(f"  import: {format_ms(percentiles(imported['samples']))}")
+        print(f"  heavy modules loaded at import: {', '.join(imported['loaded']) or 'none'}")
+        print(f"  init_plugin: {rendered['init'] * 1000:.3f}ms")
+        print(f"  get_form: {format_ms(percentiles(rendered['get_form']))}")
+        print(f"  get_page: {format_ms(percentiles(rendered['get_page']))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+基准测试公共方法：加载 app 替身与插件目录，统计分位数
+"""
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+
+
+def setup_path():
+    """
+    使用 stubs 中的 app 替身，并将 plugins.v2 下的插件作为顶层包导入
+    """
+    for path in (BENCH_DIR / "stubs", REPO_DIR / "plugins.v2"):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+
+def percentiles(samples: List[float], points=(50, 95, 99)) -> Dict[str, float]:
+    """
+    计算精确分位数
+    """
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+        result[f"p{p}"] = ordered[index]
+    result["max"] = ordered[-1]
+    return result
+
+
+def format_ms(values: Dict[str, float]) -> str:
+    return "  ".join(f"{k}={v * 1000:.3f}ms" for k, v in values.items())
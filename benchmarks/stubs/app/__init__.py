@@ -0,0 +1,3 @@
+"""
+MoviePilot 运行环境的最小替身，仅供基准测试使用
+"""
@@ -0,0 +1,27 @@
+from typing import Dict
+
+from app.core.config import settings
+from app.heavy import simulate_import
+
+simulate_import()
+
+
+class PromptManager:
+    """
+    提示词管理器替身，从 ROOT_PATH/app/agent/prompt 读取提示词并缓存
+    """
+
+    def __init__(self):
+        self.prompts_cache: Dict[str, str] = {}
+
+    def load_prompt(self, name: str) -> str:
+        if name not in self.prompts_cache:
+            path = settings.ROOT_PATH / "app" / "agent" / "prompt" / name
+            self.prompts_cache[name] = path.read_text(encoding="utf-8") if path.exists() else ""
+        return self.prompts_cache[name]
+
+    def clear_cache(self):
+        self.prompts_cache.clear()
+
+
+prompt_manager = PromptManager()
@@ -0,0 +1,12 @@
+import os
+import tempfile
+from pathlib import Path
+
+
+class Settings:
+    ROOT_PATH = Path(os.environ.get("MP_BENCH_ROOT") or tempfile.mkdtemp(prefix="mp-bench-"))
+    TEMP_PATH = ROOT_PATH / "temp"
+    PLUGIN_DATA_PATH = ROOT_PATH / "plugins"
+
+
+settings = Settings()
@@ -0,0 +1,26 @@
+from typing import Any, Callable, Dict, Optional
+
+
+class Event:
+    def __init__(self, event_type: Any, event_data: Optional[Dict] = None):
+        self.event_type = event_type
+        self.event_data = event_data or {}
+
+
+class EventManager:
+    """
+    只记录注册关系，不做事件分发
+    """
+
+    def __init__(self):
+        self.handlers: Dict[Any, list] = {}
+
+    def register(self, etype: Any) -> Callable:
+        def decorator(f: Callable) -> Callable:
+            self.handlers.setdefault(etype, []).append(f)
+            return f
+
+        return decorator
+
+
+eventmanager = EventManager()
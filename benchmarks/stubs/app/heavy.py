@@ -0,0 +1,11 @@
+import os
+import time
+
+
+def simulate_import():
+    """
+    模拟较重模块的导入耗时，由环境变量 MP_BENCH_HEAVY_IMPORT_MS 指定（毫秒）
+    """
+    delay = float(os.environ.get("MP_BENCH_HEAVY_IMPORT_MS") or 0)
+    if delay:
+        time.sleep(delay / 1000)
@@ -0,0 +1,5 @@
+import logging
+
+logger = logging.getLogger("moviepilot")
+logger.addHandler(logging.NullHandler())
+logger.propagate = False
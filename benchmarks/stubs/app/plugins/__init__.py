@@ -0,0 +1,46 @@
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class _PluginBase:
+    """
+    插件基类替身，post_message 按 post_latency 秒模拟发送耗时
+    """
+    # 模拟发送耗时（秒）
+    post_latency: float = 0.0
+
+    def __init__(self):
+        self._config: Dict[str, Any] = {}
+        self._data: Dict[str, Any] = {}
+        self.sent = 0
+
+    def update_config(self, config: dict, plugin_id: Optional[str] = None) -> bool:
+        self._config = dict(config)
+        return True
+
+    def get_config(self, plugin_id: Optional[str] = None) -> Optional[dict]:
+        return self._config
+
+    def get_data_path(self, plugin_id: Optional[str] = None) -> Path:
+        path = settings.PLUGIN_DATA_PATH / (plugin_id or self.__class__.__name__.lower())
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def save_data(self, key: str, value: Any, plugin_id: Optional[str] = None):
+        self._data[key] = value
+
+    def get_data(self, key: Optional[str] = None, plugin_id: Optional[str] = None) -> Any:
+        return self._data.get(key) if key else self._data
+
+    def del_data(self, key: str, plugin_id: Optional[str] = None):
+        self._data.pop(key, None)
+
+    def post_message(self, channel: Any = None, mtype: Any = None, title: Optional[str] = None,
+                     text: Optional[str] = None, image: Optional[str] = None, link: Optional[str] = None,
+                     userid: Optional[str] = None, username: Optional[str] = None, **kwargs):
+        if self.post_latency:
+            time.sleep(self.post_latency)
+        self.sent += 1
@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class EventType(Enum):
+    PluginAction = "plugin.action"
+    UserMessage = "user.message"
+
+
+class MessageChannel(Enum):
+    Wechat = "微信"
+    Telegram = "Telegram"
+    Slack = "Slack"
+    SynologyChat = "SynologyChat"
+    VoceChat = "VoceChat"
+    Web = "Web"
@@ -0,0 +1,15 @@
+from app.heavy import simulate_import
+
+simulate_import()
+
+
+class RequestUtils:
+    """
+    不发起网络请求
+    """
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_res(self, url: str, *args, **kwargs):
+        return None
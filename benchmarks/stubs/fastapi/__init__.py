@@ -0,0 +1,19 @@
+from typing import Dict, Optional
+
+
+class Request:
+    """
+    只保留请求头
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None):
+        self.headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+
+class Response:
+    def __init__(self, content=None, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                 media_type: Optional[str] = None):
+        self.body = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.media_type = media_type
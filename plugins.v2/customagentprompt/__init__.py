@@ -1,9 +1,36 @@
+import json
+import threading
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
 from typing import Any, List, Dict, Tuple, Optional
 
-from app.core.config import settings
+from fastapi import Request, Response
+
+from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
-from app.agent.prompt import prompt_manager
+from app.schemas.types import EventType
+
+from .analyzer import PromptAnalyzer
+from .compactor import ALL_STEPS, PromptCompactor
+from .composer import PromptComposer
+from .configstore import ConfigPersister
+from .history import PromptHistory
+from .promptstore import PromptStore, text_hash
+from .warmup import PromptWarmer
+from .watcher import PromptWatcher
+
+# 切换提示词方案的命令动作
+PROFILE_ACTION = "custom_agent_prompt_profile"
+
+
+def _prompt_path() -> Path:
+    """
+    提示词文件路径，首次使用时才加载系统配置
+    """
+    from app.core.config import settings
+    return settings.ROOT_PATH / "app" / "agent" / "prompt" / "Agent Prompt.txt"
 
 
 class CustomAgentPrompt(_PluginBase):
@@ -14,7 +41,7 @@ class CustomAgentPrompt(_PluginBase):
     # 插件图标
     plugin_icon = "Bookstack_A.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "2.1"
     # 插件作者
     plugin_author = "viklion"
     # 作者主页
@@ -30,90 +57,936 @@ class CustomAgentPrompt(_PluginBase):
     _enabled: bool = False
     _auto_replace: bool = False
     _prompt_custom: Optional[str] = None
+    _token_budget: int = 0
+    _compact_enabled: bool = False
+    _compact_steps: List[str] = list(ALL_STEPS)
+    _compact_comment_prefix: str = "//"
+    _profiles_json: Optional[str] = None
+    _active_profile: str = ""
+    _profile_admins: Optional[str] = None
+    _fragments_json: Optional[str] = None
+    _history_limit: int = 50
+    _history_max_kb: int = 512
+
+    # 提示词方案：名称 -> 内容
+    _profiles: Dict[str, str] = {}
+    # 方案切换锁
+    _profile_lock = threading.Lock()
 
-    prompt_txt = settings.ROOT_PATH / "app"  / "agent" / "prompt" / "Agent Prompt.txt"
+    # 提示词文件缓存
+    prompt_store = PromptStore(_prompt_path)
+    # 提示词文件监听
+    _watcher: Optional[PromptWatcher] = None
+    # 提示词缓存预热
+    prompt_warmer = PromptWarmer()
+    # 提示词大小分析
+    prompt_analyzer = PromptAnalyzer()
+    # 提示词压缩
+    prompt_compactor = PromptCompactor()
+    # 提示词片段组合
+    prompt_composer = PromptComposer()
+    # 提示词版本历史
+    _history: Optional[PromptHistory] = None
+    # 配置保存
+    _config_persister = ConfigPersister()
+    # 已保存到插件数据的自定义提示词哈希
+    _prompt_custom_saved: Optional[str] = None
+    # 配置页面提示词统计缓存：(状态, 统计文本)
+    _form_summary: Optional[Tuple[tuple, str]] = None
 
     def init_plugin(self, config: dict = None):
+        # 停止现有任务
+        self.stop_service()
+
         # 配置
         if config:
             self._enabled = config.get("enabled", False)
             self._auto_replace = config.get("auto_replace", False)
-            self._prompt_custom = config.get("prompt_custom") or self.prompt_txt.read_text(encoding="utf-8")
+            # 自定义提示词正文保存在插件数据中，配置中只保存哈希；表单提交时配置中带有正文
+            self._prompt_custom = config.get("prompt_custom") or self.get_data("prompt_custom") \
+                or self.prompt_store.read()
+            self._token_budget = self.__to_int(config.get("token_budget"), 0)
+            self._compact_enabled = config.get("compact_enabled", False)
+            self._compact_steps = config.get("compact_steps") or list(ALL_STEPS)
+            self._compact_comment_prefix = config.get("compact_comment_prefix", "//") or ""
+            self._profiles_json = config.get("profiles", None)
+            self._active_profile = config.get("active_profile") or ""
+            self._profile_admins = config.get("profile_admins", None)
+            self._profiles = self.__parse_named(self._profiles_json, "prompt", "提示词方案")
+            self._fragments_json = config.get("fragments", None)
+            invalidated = self.prompt_composer.update(
+                self.__parse_named(self._fragments_json, "content", "提示词片段"))
+            if invalidated:
+                logger.info(f"提示词片段已更新，需重新生成：{', '.join(invalidated)}")
+            if self._active_profile and self._active_profile not in self._profiles:
+                logger.warning(f"提示词方案 {self._active_profile} 不存在，使用自定义提示词")
+                self._active_profile = ""
+            self._history_limit = self.__to_int(config.get("history_limit"), 50)
+            self._history_max_kb = self.__to_int(config.get("history_max_kb"), 512)
+            self.__init_history()
+
+            report = self.prompt_analyzer.compare(self.__render_prompt(), self.prompt_store.read(), self._token_budget)
+            if report["over_budget"]:
+                logger.warning(f"自定义提示词约 {report['custom']['tokens']} tokens，"
+                               f"超出预算 {self._token_budget} tokens")
 
             # 单次写入
+            applied = False
             if self._enabled:
-                if self._prompt_custom:
-                    self.prompt_txt.write_text(self._prompt_custom, encoding="utf-8")
-                    logger.info("已单次更新智能体提示词内容")
-                    # 清空提示词缓存
-                    prompt_manager.clear_cache()
+                if self.__source_prompt():
+                    self.__apply_prompt("已单次更新智能体提示词内容")
+                    applied = True
                 else:
                     logger.warning("智能体提示词内容为空，本次未写入")
                 self._enabled = False
-                # 保存配置
-                self.__update_config()
-                return
 
-            # 自动替换
+            # 自动替换，与单次写入同时开启时仍需监听提示词文件
             if self._auto_replace:
-                if self._prompt_custom:
-                    self.prompt_txt.write_text(self._prompt_custom, encoding="utf-8")
-                    logger.info("已自动替换智能体提示词内容")
-                    # 清空提示词缓存
-                    prompt_manager.clear_cache()
+                if self.__source_prompt():
+                    if not applied:
+                        self.__apply_prompt("已自动替换智能体提示词内容")
+                    # 运行期间提示词文件被覆盖时重新替换
+                    self._watcher = PromptWatcher(self.prompt_store.path, on_change=self.__check_drift)
+                    self._watcher.start()
                 else:
                     logger.warning("智能体提示词内容为空，未自动替换")
 
             self.__update_config()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value) if value not in (None, "") else default
+        except (TypeError, ValueError):
+            return default
+
+    def __init_history(self):
+        """
+        加载提示词版本历史，已加载时只更新保留数量与大小
+        """
+        max_bytes = self._history_max_kb * 1024
+        if self._history is None:
+            self._history = PromptHistory(data=self.get_data("history"),
+                                          save=lambda data: self.save_data("history", data),
+                                          limit=self._history_limit,
+                                          max_bytes=max_bytes)
+        else:
+            self._history.configure(self._history_limit, max_bytes)
+
+    def __check_drift(self):
+        """
+        提示词文件变化后，与自定义提示词不一致时重新替换
+        """
+        if not self._auto_replace or not self.__source_prompt():
+            return
+        if self.prompt_store.hash == text_hash(self.__render_prompt()):
+            return
+        self.__apply_prompt("检测到智能体提示词被覆盖，已重新替换")
+
+    @staticmethod
+    def __parse_named(value: Optional[str], field: str, label: str) -> Dict[str, str]:
+        """
+        解析提示词方案或片段配置，格式为JSON数组，每项包含name与field指定的内容，内容可为字符串或按行拆分的字符串数组
+        :param label: 日志中的配置名称
+        """
+        if not value or not value.strip():
+            return {}
+        try:
+            items = json.loads(value)
+        except ValueError as e:
+            logger.error(f"{label}解析失败：{e}")
+            return {}
+        if not isinstance(items, list):
+            logger.error(f"{label}格式错误，应为JSON数组")
+            return {}
+
+        result: Dict[str, str] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            name = str(item.get("name") or "").strip()
+            prompt = item.get(field)
+            if isinstance(prompt, list):
+                prompt = "\n".join(str(line) for line in prompt)
+            if not name or not prompt:
+                continue
+            if name in result:
+                logger.warning(f"{label} {name} 重复，已忽略")
+                continue
+            result[name] = prompt
+        return result
+
+    def __source_prompt(self, profile: Optional[str] = None) -> Optional[str]:
+        """
+        获取提示词原文：指定或当前启用的方案，未启用方案时为自定义提示词
+        """
+        name = self._active_profile if profile is None else profile
+        if name:
+            return self._profiles.get(name)
+        return self._prompt_custom
+
+    def __render_prompt(self, profile: Optional[str] = None) -> Optional[str]:
+        """
+        生成写入提示词文件的内容：展开片段引用，开启压缩时返回压缩后的内容，提示词原文保持不变
+        """
+        source = self.prompt_composer.compose(self.__source_prompt(profile))
+        if not self._compact_enabled or not source:
+            return source
+        return self.prompt_compactor.compact(source,
+                                             steps=self._compact_steps,
+                                             comment_prefix=self._compact_comment_prefix)
+
+    def __apply_prompt(self, msg: str, label: Optional[str] = None):
+        """
+        写入自定义提示词，内容与当前提示词一致时不写入也不刷新缓存
+        :param label: 记录到版本历史的说明，默认为方案名称
+        """
+        if self._history is not None:
+            self._history.record(self.__source_prompt(), label=label or self._active_profile or "自定义提示词")
+        if not self.prompt_store.write(self.__render_prompt()):
+            logger.info("智能体提示词内容未变化，无需更新")
+            return
+        logger.info(msg)
+        # 后台重建提示词缓存
+        from app.agent.prompt import prompt_manager
+        self.prompt_warmer.refresh(prompt_manager, self.prompt_store.path.name)
+
+    def __activate_profile(self, name: Optional[str]) -> Tuple[bool, str]:
+        """
+        切换提示词方案，使用内存中的方案内容直接写入提示词文件，已是当前方案时不做任何操作
+        :param name: 方案名称，为空时切换回自定义提示词
+        """
+        name = (name or "").strip()
+        if name and name not in self._profiles:
+            return False, f"提示词方案 {name} 不存在"
+        if not self.__source_prompt(name):
+            return False, "自定义提示词内容为空"
+        label = name or "自定义提示词"
+        with self._profile_lock:
+            if name == self._active_profile and self.prompt_store.hash == text_hash(self.__render_prompt(name)):
+                return True, f"当前已是{label}"
+            self._active_profile = name
+            self.__apply_prompt(f"已切换智能体提示词为{label}")
+            # 只保存配置，不重新加载插件
+            self.__update_config()
+        return True, f"已切换为{label}"
+
+    def __rollback(self, version: int) -> Tuple[bool, str]:
+        """
+        回滚到指定版本：该版本内容作为自定义提示词写入，并切换回自定义提示词
+        """
+        text = self._history.get(version) if self._history is not None else None
+        if not text:
+            return False, f"版本 {version} 不存在"
+        with self._profile_lock:
+            self._prompt_custom = text
+            self._active_profile = ""
+            self.__apply_prompt(f"已回滚智能体提示词至版本 {version}", label=f"回滚至版本 {version}")
+            self.__update_config()
+        return True, f"已回滚至版本 {version}"
+
     def __update_config(self):
+        # 自定义提示词正文变化时才写入插件数据
+        custom_hash = text_hash(self._prompt_custom)
+        if self._prompt_custom_saved is None:
+            self._prompt_custom_saved = text_hash(self.get_data("prompt_custom"))
+        if custom_hash != self._prompt_custom_saved:
+            self.save_data("prompt_custom", self._prompt_custom)
+            self._prompt_custom_saved = custom_hash
         # 保存配置
-        self.update_config(
+        self._config_persister.persist(
+            self,
             {
                 "enabled": self._enabled,
                 "auto_replace": self._auto_replace,
-                "prompt_custom": self._prompt_custom,
-                "prompt_now": self.prompt_txt.read_text(encoding="utf-8"),
+                "prompt_custom_hash": custom_hash,
+                "prompt_now_hash": self.prompt_store.hash,
+                "token_budget": self._token_budget,
+                "compact_enabled": self._compact_enabled,
+                "compact_steps": self._compact_steps,
+                "compact_comment_prefix": self._compact_comment_prefix,
+                "profiles": self._profiles_json,
+                "active_profile": self._active_profile,
+                "profile_admins": self._profile_admins,
+                "fragments": self._fragments_json,
+                "history_limit": self._history_limit,
+                "history_max_kb": self._history_max_kb,
             }
         )
 
     def get_state(self) -> bool:
         return self._auto_replace
 
-    @staticmethod
-    def get_command() -> List[Dict[str, Any]]:
-        pass
+    def get_command(self) -> List[Dict[str, Any]]:
+        """
+        定义远程控制命令
+        :return: 命令关键字、事件、描述、附带数据
+        """
+        if not self._profiles:
+            return []
+        return [{
+            "cmd": "/prompt_profile",
+            "event": EventType.PluginAction,
+            "desc": "切换智能体提示词方案",
+            "category": "",
+            "data": {
+                "action": PROFILE_ACTION
+            }
+        }]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [{
+            "path": "/profiles",
+            "endpoint": self.api_profiles,
+            "methods": ["GET"],
+            "summary": "提示词方案列表",
+            "description": "列出提示词方案及当前启用的方案",
+        }, {
+            "path": "/profiles/activate",
+            "endpoint": self.api_activate_profile,
+            "methods": ["POST"],
+            "summary": "切换提示词方案",
+            "description": "切换到指定提示词方案，name为空时切换回自定义提示词",
+        }, {
+            "path": "/profiles/preview",
+            "endpoint": self.api_preview_profile,
+            "methods": ["GET"],
+            "summary": "预览提示词方案",
+            "description": "返回指定提示词方案写入时的内容与大小，name为空时为自定义提示词",
+        }, {
+            "path": "/history",
+            "endpoint": self.api_history,
+            "methods": ["GET"],
+            "summary": "提示词版本历史",
+            "description": "列出已应用过的提示词版本，version不为空时返回该版本内容",
+        }, {
+            "path": "/history/diff",
+            "endpoint": self.api_history_diff,
+            "methods": ["GET"],
+            "summary": "提示词版本对比",
+            "description": "对比两个版本的差异，new为空时与最新版本对比",
+        }, {
+            "path": "/history/rollback",
+            "endpoint": self.api_history_rollback,
+            "methods": ["POST"],
+            "summary": "回滚提示词版本",
+            "description": "将指定版本作为自定义提示词重新写入",
+        }, {
+            "path": "/prompt/current",
+            "endpoint": self.api_prompt_current,
+            "methods": ["GET"],
+            "summary": "当前提示词",
+            "description": "返回提示词文件内容，支持ETag条件请求，未变化时返回304",
+        }, {
+            "path": "/prompt/custom",
+            "endpoint": self.api_prompt_custom,
+            "methods": ["GET"],
+            "summary": "自定义提示词",
+            "description": "返回自定义提示词原文，支持ETag条件请求，未变化时返回304",
+        }, {
+            "path": "/fragments",
+            "endpoint": self.api_fragments,
+            "methods": ["GET"],
+            "summary": "提示词片段",
+            "description": "列出提示词片段及引用关系，name不为空时返回该片段展开引用后的内容",
+        }]
+
+    @staticmethod
+    def __etag_response(request: Request, text: Optional[str], digest: Optional[str]) -> Response:
+        """
+        按内容哈希生成ETag，请求的If-None-Match匹配时返回304
+        """
+        etag = f'"{digest or text_hash(text)}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if etag in tags or "*" in tags:
+                return Response(status_code=304, headers=headers)
+        return Response(content=text or "", media_type="text/plain; charset=utf-8", headers=headers)
+
+    def api_prompt_current(self, request: Request) -> Response:
+        """
+        API：当前提示词
+        """
+        return self.__etag_response(request, self.prompt_store.read(), self.prompt_store.hash)
+
+    def api_prompt_custom(self, request: Request) -> Response:
+        """
+        API：自定义提示词
+        """
+        return self.__etag_response(request, self._prompt_custom, None)
+
+    def api_fragments(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        API：提示词片段
+        """
+        if name:
+            content = self.prompt_composer.render(name)
+            if content is None:
+                return {"success": False, "message": f"提示词片段 {name} 不存在"}
+            return {"success": True, "name": name, "content": content}
+        return {"success": True, "fragments": self.prompt_composer.graph(),
+                "renders": self.prompt_composer.renders,
+                "invalidated": self.prompt_composer.invalidated}
+
+    def api_profiles(self) -> Dict[str, Any]:
+        """
+        API：提示词方案列表
+        """
+        profiles = []
+        for name in self._profiles:
+            stats = self.prompt_analyzer.analyze(self.__render_prompt(name))
+            profiles.append({"name": name, "chars": stats["chars"], "tokens": stats["tokens"],
+                             "active": name == self._active_profile})
+        return {"active": self._active_profile, "profiles": profiles}
+
+    def api_activate_profile(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        API：切换提示词方案
+        """
+        success, msg = self.__activate_profile(name)
+        return {"success": success, "message": msg}
+
+    def api_preview_profile(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        API：预览提示词方案
+        """
+        name = (name or "").strip()
+        if name and name not in self._profiles:
+            return {"success": False, "message": f"提示词方案 {name} 不存在"}
+        prompt = self.__render_prompt(name)
+        stats = self.prompt_analyzer.analyze(prompt)
+        return {"success": True, "name": name, "prompt": prompt,
+                "chars": stats["chars"], "tokens": stats["tokens"]}
+
+    def api_history(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        API：提示词版本历史
+        """
+        if self._history is None:
+            return {"success": False, "message": "插件未初始化"}
+        if version:
+            text = self._history.get(int(version))
+            if text is None:
+                return {"success": False, "message": f"版本 {version} 不存在"}
+            return {"success": True, "version": int(version), "prompt": text}
+        return {"success": True, "size": self._history.size, "versions": self._history.versions()}
+
+    def api_history_diff(self, old: int, new: Optional[int] = None) -> Dict[str, Any]:
+        """
+        API：提示词版本对比
+        """
+        diff = self._history.diff(int(old), int(new) if new else None) if self._history is not None else None
+        if diff is None:
+            return {"success": False, "message": "版本不存在"}
+        return {"success": True, "diff": diff}
+
+    def api_history_rollback(self, version: int) -> Dict[str, Any]:
+        """
+        API：回滚提示词版本
+        """
+        success, msg = self.__rollback(int(version))
+        return {"success": success, "message": msg}
+
+    @eventmanager.register(EventType.PluginAction)
+    def switch_profile(self, event: Event = None):
+        """
+        收到命令，切换提示词方案，不带参数时列出可用方案
+        """
+        if not event:
+            return
+        event_data = event.event_data
+        if not event_data or event_data.get("action") != PROFILE_ACTION:
+            return
+        channel = event_data.get("channel")
+        userid = event_data.get("user")
+        source = event_data.get("source")
+        name = (event_data.get("arg_str") or "").strip()
+        if not name:
+            names = "\n".join(f"{'* ' if n == self._active_profile else ''}{n}" for n in self._profiles)
+            self.post_message(channel=channel, title="提示词方案", text=names or "未配置提示词方案",
+                              userid=userid, source=source)
+            return
+        admins = {x.strip() for x in (self._profile_admins or "").split(",") if x.strip()}
+        if str(userid) not in admins:
+            logger.warning(f"用户{userid}无切换提示词方案权限")
+            self.post_message(channel=channel, title="无切换提示词方案权限", userid=userid, source=source)
+            return
+        success, msg = self.__activate_profile(name)
+        logger.info(f"用户{userid}切换提示词方案：{msg}")
+        self.post_message(channel=channel, title=msg, userid=userid, source=source)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def __form_static() -> Dict[str, Any]:
+        """
+        配置页面中与配置无关的部分，只构建一次，返回的结构为共享对象，不可修改
+        """
+        return {
+            'settings': [
+                {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'md': 3
+                    },
+                    'content': [
+                        {
+                            'component': 'VSwitch',
+                            'props': {
+                                'model': 'auto_replace',
+                                'label': '自动替换提示词',
+                            }
+                        }
+                    ]
+                },
+                {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'md': 3
+                    },
+                    'content': [
+                        {
+                            'component': 'VSwitch',
+                            'props': {
+                                'model': 'enabled',
+                                'label': '本次替换提示词',
+                            }
+                        }
+                    ]
+                },
+                {
+                    'component': 'VCol',
+                    'props': {
+                        'cols': 12,
+                        'md': 3
+                    },
+                    'content': [
+                        {
+                            'component': 'VTextField',
+                            'props': {
+                                'model': 'token_budget',
+                                'label': 'Token预算',
+                                'type': 'number',
+                                'placeholder': '0',
+                                'hint': '自定义提示词超出预算时提醒，0为不限制',
+                                'persistent-hint': True,
+                            }
+                        }
+                    ]
+                },
+            ],
+            'rows': [
+                {
+                    'component': 'VRow',
+                    'content': [
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 3
+                            },
+                            'content': [
+                                {
+                                    'component': 'VSwitch',
+                                    'props': {
+                                        'model': 'compact_enabled',
+                                        'label': '压缩提示词',
+                                        'hint': '写入前压缩，自定义提示词原文不变',
+                                        'persistent-hint': True,
+                                    }
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 6
+                            },
+                            'content': [
+                                {
+                                    'component': 'VSelect',
+                                    'props': {
+                                        'model': 'compact_steps',
+                                        'label': '压缩步骤',
+                                        'multiple': True,
+                                        'chips': True,
+                                        'items': [
+                                            {'title': '合并多余空白', 'value': 'whitespace'},
+                                            {'title': '删除注释行', 'value': 'comments'},
+                                            {'title': '删除重复段落', 'value': 'dedupe'},
+                                            {'title': '统一列表格式', 'value': 'lists'},
+                                        ]
+                                    }
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 3
+                            },
+                            'content': [
+                                {
+                                    'component': 'VTextField',
+                                    'props': {
+                                        'model': 'compact_comment_prefix',
+                                        'label': '注释行前缀',
+                                        'placeholder': '//',
+                                    }
+                                }
+                            ]
+                        }
+                    ]
+                },
+                {
+                    'component': 'VRow',
+                    'content': [
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 3
+                            },
+                            'content': [
+                                {
+                                    'component': 'VTextField',
+                                    'props': {
+                                        'model': 'history_limit',
+                                        'label': '历史版本数',
+                                        'type': 'number',
+                                        'placeholder': '50',
+                                    }
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 3
+                            },
+                            'content': [
+                                {
+                                    'component': 'VTextField',
+                                    'props': {
+                                        'model': 'history_max_kb',
+                                        'label': '历史记录大小上限（KB）',
+                                        'type': 'number',
+                                        'placeholder': '512',
+                                        'hint': '0为不限制',
+                                        'persistent-hint': True,
+                                    }
+                                }
+                            ]
+                        },
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                'cols': 12,
+                                'md': 6
+                            },
+                            'content': [
+                                {
+                                    'component': 'VTextField',
+                                    'props': {
+                                        'model': 'profile_admins',
+                                        'label': '方案切换管理员',
+                                        'placeholder': '用户1,用户2',
+                                        'hint': '允许使用/prompt_profile命令切换方案的用户ID，多个用英文逗号分隔',
+                                        'persistent-hint': True,
+                                    }
+                                }
+                            ]
+                        }
+                    ]
+                },
+            ],
+            'link': {
+                'component': 'a',
+                'props': {
+                    'href': 'https://github.com/jxxghp/MoviePilot/blob/v2/app/agent/prompt/Agent%20Prompt.txt',
+                    'target': '_blank'
+                },
+                'content': [
+                    {
+                        'component': 'u',
+                        'text': '[github]jxxghp/MoviePilot - Agent Prompt.txt'
+                    }
+                ]
+            },
+            'tabs': {
+                'component': 'VTabs',
+                'props': {
+                    'model': '_tabs',
+                    'style': {
+                        'margin-top': '8px',
+                        'margin-bottom': '16px'
+                    },
+                    'stacked': False,
+                    'fixed-tabs': False
+                },
+                'content': [
+                    {
+                        'component': 'VTab',
+                        'props': {
+                            'value': 'preset_tab'
+                        },
+                        'text': '当前提示词'
+                    }, {
+                        'component': 'VTab',
+                        'props': {
+                            'value': 'custom_tab'
+                        },
+                        'text': '自定义提示词'
+                    }, {
+                        'component': 'VTab',
+                        'props': {
+                            'value': 'profile_tab'
+                        },
+                        'text': '提示词方案'
+                    }, {
+                        'component': 'VTab',
+                        'props': {
+                            'value': 'fragment_tab'
+                        },
+                        'text': '提示词片段'
+                    }
+                ]
+            },
+            'windows': [
+                {
+                    'component': 'VWindowItem',
+                    'props': {
+                        'value': 'custom_tab'
+                    },
+                    'content': [
+                        {
+                            'component': 'VRow',
+                            'content': [
+                                {
+                                    'component': 'VCol',
+                                    'props': {
+                                        "cols": 12
+                                    },
+                                    'content': [
+                                        {
+                                            'component': 'VAceEditor',
+                                            'props': {
+                                                'modelvalue': 'prompt_custom',
+                                                'lang': 'text',
+                                                'theme': 'monokai',
+                                                'style': 'height: 35rem; font-size: 14px'
+                                            }
+                                        }
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                },
+                {
+                    'component': 'VWindowItem',
+                    'props': {
+                        'value': 'profile_tab'
+                    },
+                    'content': [
+                        {
+                            'component': 'VRow',
+                            'content': [
+                                {
+                                    'component': 'VCol',
+                                    'props': {
+                                        "cols": 12
+                                    },
+                                    'content': [
+                                        {
+                                            'component': 'VAceEditor',
+                                            'props': {
+                                                'modelvalue': 'profiles',
+                                                'lang': 'json',
+                                                'theme': 'monokai',
+                                                'style': 'height: 35rem; font-size: 14px'
+                                            }
+                                        }
+                                    ]
+                                },
+                                {
+                                    'component': 'VCol',
+                                    'props': {
+                                        "cols": 12
+                                    },
+                                    'content': [
+                                        {
+                                            'component': 'VAlert',
+                                            'props': {
+                                                'type': 'info',
+                                                'variant': 'tonal',
+                                                'style': 'white-space: pre-line;',
+                                                'text': '提示词方案格式为JSON数组，prompt可为字符串或按行拆分的字符串数组，例如：\n'
+                                                        '[{"name": "简洁", "prompt": ["第一行", "第二行"]}]\n'
+                                                        '方案为空时使用自定义提示词；可通过命令 /prompt_profile 名称 或插件API快速切换，'
+                                                        '不带名称时列出可用方案；通过命令切换需将用户ID加入方案切换管理员。'
+                                            }
+                                        }
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                },
+                {
+                    'component': 'VWindowItem',
+                    'props': {
+                        'value': 'fragment_tab'
+                    },
+                    'content': [
+                        {
+                            'component': 'VRow',
+                            'content': [
+                                {
+                                    'component': 'VCol',
+                                    'props': {
+                                        "cols": 12
+                                    },
+                                    'content': [
+                                        {
+                                            'component': 'VAceEditor',
+                                            'props': {
+                                                'modelvalue': 'fragments',
+                                                'lang': 'json',
+                                                'theme': 'monokai',
+                                                'style': 'height: 35rem; font-size: 14px'
+                                            }
+                                        }
+                                    ]
+                                },
+                                {
+                                    'component': 'VCol',
+                                    'props': {
+                                        "cols": 12
+                                    },
+                                    'content': [
+                                        {
+                                            'component': 'VAlert',
+                                            'props': {
+                                                'type': 'info',
+                                                'variant': 'tonal',
+                                                'style': 'white-space: pre-line;',
+                                                'text': '提示词片段格式为JSON数组，content可为字符串或按行拆分的字符串数组，例如：\n'
+                                                        '[{"name": "角色", "content": ["你是影视助手"]}, '
+                                                        '{"name": "规则", "content": "{{include 角色}}\\n回答要简洁"}]\n'
+                                                        '在自定义提示词、提示词方案或其他片段中单独一行写 {{include 片段名称}} 引用片段，'
+                                                        '写入时按顺序展开；只修改某个片段时，仅重新生成该片段及引用它的片段，'
+                                                        '展开后的内容未变化时不写入提示词文件。'
+                                            }
+                                        }
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                },
+            ],
+        }
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def __form_preset_item(same_hash: Optional[str]) -> dict:
+        """
+        当前提示词页：与自定义提示词一致时只显示提示，不绑定可编辑的自定义提示词，否则只读显示当前提示词
+        :param same_hash: 与自定义提示词一致时为内容哈希
+        """
+        if same_hash:
+            return {
+                'component': 'VWindowItem',
+                'props': {
+                    'value': 'preset_tab'
+                },
+                'content': [
+                    {
+                        'component': 'VAlert',
+                        'props': {
+                            'type': 'success',
+                            'variant': 'tonal',
+                            'text': f'当前提示词与已保存的自定义提示词一致（sha256: {same_hash[:12]}），'
+                                    f'内容见自定义提示词页。'
+                        }
+                    }
+                ]
+            }
+        return {
+            'component': 'VWindowItem',
+            'props': {
+                'value': 'preset_tab'
+            },
+            'content': [
+                {
+                    'component': 'VRow',
+                    'content': [
+                        {
+                            'component': 'VCol',
+                            'props': {
+                                "cols": 12
+                            },
+                            'content': [
+                                {
+                                    'component': 'VAceEditor',
+                                    'props': {
+                                        'modelvalue': 'prompt_now',
+                                        'lang': 'text',
+                                        'theme': 'monokai',
+                                        'style': 'height: 35rem; font-size: 14px',
+                                        'readonly': True
+                                    }
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+
+    def __form_summary(self, prompt_now: Optional[str]) -> str:
+        """
+        配置页面的提示词统计，提示词与压缩配置未变化时复用上次结果
+        """
+        state = (self.prompt_store.hash, self._prompt_custom_saved, self._active_profile, self._profiles_json,
+                 self._fragments_json, self._compact_enabled, tuple(self._compact_steps), self._compact_comment_prefix)
+        if self._form_summary and self._form_summary[0] == state:
+            return self._form_summary[1]
+        stats = self.prompt_analyzer.analyze(prompt_now)
+        summary = f'当前提示词 {stats["chars"]} 字符，约 {stats["tokens"]} tokens，详见插件详情页。\n'
+        if self._compact_enabled and self.__source_prompt():
+            source = self.prompt_analyzer.analyze(self.__source_prompt())
+            compacted = self.prompt_analyzer.analyze(self.__render_prompt())
+            summary += (f'自定义提示词压缩前 {source["chars"]} 字符 / 约 {source["tokens"]} tokens，'
+                        f'压缩后 {compacted["chars"]} 字符 / 约 {compacted["tokens"]} tokens。\n')
+        self._form_summary = (state, summary)
+        return summary
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
         拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
         """
+        prompt_now = self.prompt_store.read()
+        prompt_custom = self._prompt_custom or prompt_now
+        # 当前提示词与自定义提示词一致时，当前提示词页只显示提示，表单数据中不重复携带
+        now_hash = self.prompt_store.hash
+        same_hash = now_hash if now_hash and now_hash == text_hash(prompt_custom) else None
+        summary = self.__form_summary(prompt_now)
+        static = self.__form_static()
         return [
             {
                 'component': 'VForm',
                 'content': [
                     {
                         'component': 'VRow',
-                        'content': [
-                            {
-                                'component': 'VCol',
-                                'props': {
-                                    'cols': 12,
-                                    'md': 3
-                                },
-                                'content': [
-                                    {
-                                        'component': 'VSwitch',
-                                        'props': {
-                                            'model': 'auto_replace',
-                                            'label': '自动替换提示词',
-                                        }
-                                    }
-                                ]
-                            },
+                        'content': static['settings'] + [
                             {
                                 'component': 'VCol',
                                 'props': {
@@ -122,16 +995,19 @@ class CustomAgentPrompt(_PluginBase):
                                 },
                                 'content': [
                                     {
-                                        'component': 'VSwitch',
+                                        'component': 'VSelect',
                                         'props': {
-                                            'model': 'enabled',
-                                            'label': '本次替换提示词',
+                                            'model': 'active_profile',
+                                            'label': '提示词方案',
+                                            'items': [{'title': '自定义提示词', 'value': ''}]
+                                                     + [{'title': name, 'value': name} for name in self._profiles],
                                         }
                                     }
                                 ]
                             }
                         ]
                     },
+                    *static['rows'],
                     {
                         'component': 'VRow',
                         'props': {
@@ -151,140 +1027,198 @@ class CustomAgentPrompt(_PluginBase):
                                             'type': 'info',
                                             'variant': 'tonal',
                                             'style': 'white-space: pre-line;',
-                                            'text': '注意：\n'
+                                            'text': summary +
+                                                    '注意：\n'
                                                     '*如果容器更新后提示词恢复默认，可以尝试开启自动替换。\n'
                                                     '默认提示词内容见：'
                                         },
-                                        'content': [
-                                            {
-                                                'component': 'a',
-                                                'props': {
-                                                    'href': 'https://github.com/jxxghp/MoviePilot/blob/v2/app/agent/prompt/Agent%20Prompt.txt',
-                                                    'target': '_blank'
-                                                },
-                                                'content': [
-                                                    {
-                                                        'component': 'u',
-                                                        'text': '[github]jxxghp/MoviePilot - Agent Prompt.txt'
-                                                    }
-                                                ]
-                                            }
-                                        ]
+                                        'content': [static['link']]
                                     }
                                 ]
                             },
                         ]
                     },
+                    static['tabs'],
                     {
-                        'component': 'VTabs',
+                        'component': 'VWindow',
                         'props': {
-                            'model': '_tabs',
-                            'style': {
-                                'margin-top': '8px',
-                                'margin-bottom': '16px'
-                            },
-                            'stacked': False,
-                            'fixed-tabs': False
+                            'model': '_tabs'
                         },
+                        'content': [self.__form_preset_item(same_hash), *static['windows']]
+                    },
+                ]
+            }
+        ], {
+            "enabled": False,
+            "auto_replace": False,
+            **({} if same_hash else {"prompt_now": prompt_now}),
+            "prompt_custom": prompt_custom,
+            "token_budget": 0,
+            "compact_enabled": False,
+            "compact_steps": list(ALL_STEPS),
+            "compact_comment_prefix": "//",
+            "profiles": "[]",
+            "active_profile": "",
+            "profile_admins": "",
+            "fragments": "[]",
+            "history_limit": 50,
+            "history_max_kb": 512,
+        }
+
+    def get_page(self) -> List[dict]:
+        """
+        拼装插件详情页面，展示提示词大小分析
+        """
+        current = self.prompt_store.read()
+        report = self.prompt_analyzer.compare(self.__render_prompt() or current, current, self._token_budget)
+        warmup = self.prompt_warmer.last
+
+        def _table(headers: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> dict:
+            return {
+                'component': 'VTable',
+                'props': {
+                    'hover': True
+                },
+                'content': [
+                    {
+                        'component': 'thead',
                         'content': [
                             {
-                                'component': 'VTab',
+                                'component': 'th',
                                 'props': {
-                                    'value': 'preset_tab'
+                                    'class': 'text-start ps-4'
                                 },
-                                'text': '当前提示词'
-                            }, {
-                                'component': 'VTab',
-                                'props': {
-                                    'value': 'custom_tab'
-                                },
-                                'text': '自定义提示词'
-                            }
+                                'text': header
+                            } for header in headers
                         ]
                     },
                     {
-                        'component': 'VWindow',
-                        'props': {
-                            'model': '_tabs'
-                        },
+                        'component': 'tbody',
                         'content': [
                             {
-                                'component': 'VWindowItem',
-                                'props': {
-                                    'value': 'preset_tab'
-                                },
+                                'component': 'tr',
                                 'content': [
                                     {
-                                        'component': 'VRow',
-                                        'content': [
-                                            {
-                                                'component': 'VCol',
-                                                'props': {
-                                                    "cols": 12
-                                                },
-                                                'content': [
-                                                    {
-                                                        'component': 'VAceEditor',
-                                                        'props': {
-                                                            'modelvalue': 'prompt_now',
-                                                            'lang': 'text',
-                                                            'theme': 'monokai',
-                                                            'style': 'height: 35rem; font-size: 14px',
-                                                            'readonly': True
-                                                        }
-                                                    }
-                                                ]
-                                            }
-                                        ]
-                                    }
+                                        'component': 'td',
+                                        'props': {
+                                            'class': 'ps-4'
+                                        },
+                                        'text': str(text)
+                                    } for text in row
                                 ]
-                            },
+                            } for row in rows
+                        ]
+                    }
+                ]
+            }
+
+        def _card(title: str, value: Any) -> dict:
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 6,
+                    'md': 3
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'tonal'
+                        },
+                        'content': [
                             {
-                                'component': 'VWindowItem',
-                                'props': {
-                                    'value': 'custom_tab'
-                                },
+                                'component': 'VCardText',
                                 'content': [
                                     {
-                                        'component': 'VRow',
-                                        'content': [
-                                            {
-                                                'component': 'VCol',
-                                                'props': {
-                                                    "cols": 12
-                                                },
-                                                'content': [
-                                                    {
-                                                        'component': 'VAceEditor',
-                                                        'props': {
-                                                            'modelvalue': 'prompt_custom',
-                                                            'lang': 'text',
-                                                            'theme': 'monokai',
-                                                            'style': 'height: 35rem; font-size: 14px'
-                                                        }
-                                                    }
-                                                ]
-                                            }
-                                        ]
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-caption'
+                                        },
+                                        'text': title
+                                    },
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-h6'
+                                        },
+                                        'text': str(value)
                                     }
                                 ]
                             }
                         ]
-                    },
+                    }
                 ]
             }
-        ], {
-            "enabled": False,
-            "auto_replace": False,
-            "prompt_now" : self.prompt_txt.read_text(encoding="utf-8"),
-            "prompt_custom": self.prompt_txt.read_text(encoding="utf-8"),
-        }
 
-    def get_page(self) -> List[dict]:
-        pass
+        page = [
+            {
+                'component': 'VRow',
+                'content': [
+                    _card('当前提示词 tokens', report["current"]["tokens"]),
+                    _card('自定义提示词 tokens', report["custom"]["tokens"]),
+                    _card('差值', f'{report["delta"]:+d}'),
+                    _card('Token预算', report["budget"] or '不限制'),
+                ]
+            }
+        ]
+        if report["over_budget"]:
+            page.append({
+                'component': 'VAlert',
+                'props': {
+                    'type': 'warning',
+                    'variant': 'tonal',
+                    'text': f'自定义提示词约 {report["custom"]["tokens"]} tokens，超出预算 {report["budget"]} tokens'
+                }
+            })
+        page.append(_table(('章节', '字符数', 'tokens', '较当前'),
+                           [(section["title"], section["chars"], section["tokens"], f'{section["delta"]:+d}')
+                            for section in report["sections"]]))
+        page.append({
+            'component': 'div',
+            'props': {
+                'class': 'text-caption mt-2'
+            },
+            'text': 'token数为离线估算值，仅供参考。'
+                    + (f'最近一次提示词缓存预热耗时 {warmup["duration_ms"]} ms。' if warmup else '')
+                    + '配置保存 {writes} 次，未变化跳过 {skipped} 次。'.format(**self._config_persister.stats)
+        })
+
+        if self._history is not None:
+            versions = self._history.versions()
+            page.append({
+                'component': 'div',
+                'props': {
+                    'class': 'text-subtitle-1 mt-4'
+                },
+                'text': f'版本历史（共 {len(versions)} 个版本，占用 {round(self._history.size / 1024, 1)} KB）'
+            })
+            page.append(_table(('版本', '时间', '说明', '字符数', '存储方式'),
+                               [(f'v{v["id"]}', datetime.fromtimestamp(v["time"]).strftime("%Y-%m-%d %H:%M:%S"),
+                                 v["label"], v["chars"], '快照' if v["kind"] == 'snapshot' else '差异')
+                                for v in versions]))
+            if len(versions) > 1:
+                diff = self._history.diff(versions[1]["id"], versions[0]["id"])
+                page.append({
+                    'component': 'div',
+                    'props': {
+                        'class': 'text-subtitle-2 mt-2'
+                    },
+                    'text': f'最近一次变更（v{versions[1]["id"]} → v{versions[0]["id"]}）'
+                })
+                page.append({
+                    'component': 'pre',
+                    'props': {
+                        'class': 'text-caption',
+                        'style': 'white-space: pre-wrap; max-height: 20rem; overflow: auto;'
+                    },
+                    'text': diff or '内容相同'
+                })
+        return page
 
     def stop_service(self):
         """
         退出插件
         """
-        pass
\ No newline at end of file
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
\ No newline at end of file
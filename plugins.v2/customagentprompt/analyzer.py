@@ -0,0 +1,103 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .promptstore import text_hash
+
+# 中日韩字符，每个字符约一个token
+_CJK = r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]"
+_TOKEN_PATTERN = re.compile(rf"({_CJK})|([A-Za-z]+)|(\d+)|(\S)")
+# 章节标题：Markdown标题或独占一行的XML开始标签
+_SECTION_PATTERN = re.compile(r"^\s*(#{1,6}\s+.+|<[A-Za-z_][\w\-]*>)\s*$")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    离线估算token数：中日韩字符按1个计算，英文单词按每4个字母1个，数字按每3位1个，其他符号按1个
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for cjk, word, digits, _ in _TOKEN_PATTERN.findall(text):
+        if cjk:
+            tokens += 1
+        elif word:
+            tokens += math.ceil(len(word) / 4)
+        elif digits:
+            tokens += math.ceil(len(digits) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+class PromptAnalyzer:
+    """
+    提示词大小分析，结果按内容哈希缓存
+    """
+
+    def __init__(self, cache_size: int = 16):
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._lock = threading.Lock()
+
+    def analyze(self, text: Optional[str]) -> Dict[str, Any]:
+        """
+        统计提示词字符数、token数及各章节token数
+        """
+        digest = text_hash(text)
+        with self._lock:
+            result = self._cache.get(digest)
+            if result is not None:
+                self._cache.move_to_end(digest)
+                return result
+        result = {
+            "hash": digest,
+            "chars": len(text or ""),
+            "tokens": estimate_tokens(text),
+            "sections": self.__sections(text or ""),
+        }
+        with self._lock:
+            self._cache[digest] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def compare(self, custom: Optional[str], current: Optional[str], budget: int = 0) -> Dict[str, Any]:
+        """
+        对比自定义提示词与当前提示词
+        :param budget: token预算，0为不限制
+        """
+        custom_stats = self.analyze(custom)
+        current_stats = self.analyze(current)
+        current_sections = {s["title"]: s["tokens"] for s in current_stats["sections"]}
+        sections = [dict(s, delta=s["tokens"] - current_sections.get(s["title"], 0))
+                    for s in custom_stats["sections"]]
+        return {
+            "custom": custom_stats,
+            "current": current_stats,
+            "delta": custom_stats["tokens"] - current_stats["tokens"],
+            "sections": sections,
+            "budget": budget,
+            "over_budget": bool(budget) and custom_stats["tokens"] > budget,
+        }
+
+    @staticmethod
+    def __sections(text: str) -> List[Dict[str, Any]]:
+        sections = []
+        title, lines = "（开头）", []
+
+        def _flush():
+            body = "\n".join(lines)
+            if body.strip() or title != "（开头）":
+                sections.append({"title": title, "chars": len(body), "tokens": estimate_tokens(body)})
+
+        for line in text.splitlines():
+            if _SECTION_PATTERN.match(line):
+                _flush()
+                title, lines = line.strip().lstrip("#").strip(), [line]
+            else:
+                lines.append(line)
+        _flush()
+        return sections
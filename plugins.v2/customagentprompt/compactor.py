@@ -0,0 +1,104 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from .promptstore import text_hash
+
+# 压缩步骤
+STEP_WHITESPACE = "whitespace"
+STEP_COMMENTS = "comments"
+STEP_DEDUPE = "dedupe"
+STEP_LISTS = "lists"
+ALL_STEPS = (STEP_WHITESPACE, STEP_COMMENTS, STEP_DEDUPE, STEP_LISTS)
+
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_INNER_SPACES = re.compile(r"(?<=\S)[ \t]{2,}")
+_BULLET = re.compile(r"^(\s*)[*+•·]\s+")
+_NUMBERED = re.compile(r"^(\s*)(\d+)[)）、]\s*")
+
+
+class PromptCompactor:
+    """
+    提示词压缩：合并多余空白、删除注释行、删除重复段落、统一列表格式，
+    代码块内的内容保持不变；结果按原文哈希与压缩步骤缓存
+    """
+
+    def __init__(self, cache_size: int = 8):
+        self._cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._lock = threading.Lock()
+
+    def compact(self, text: Optional[str], steps: Iterable[str] = ALL_STEPS, comment_prefix: str = "//") -> str:
+        """
+        压缩提示词
+        :param text: 提示词原文
+        :param steps: 启用的压缩步骤
+        :param comment_prefix: 注释行前缀
+        """
+        steps = tuple(sorted(set(steps or ())))
+        key = (text_hash(text), steps, comment_prefix)
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                return result
+        result = self.__compact(text or "", steps, comment_prefix)
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def __compact(text: str, steps: Tuple[str, ...], comment_prefix: str) -> str:
+        lines: List[str] = []
+        in_fence = False
+        for line in text.splitlines():
+            if _FENCE.match(line):
+                in_fence = not in_fence
+                lines.append(line.rstrip() if STEP_WHITESPACE in steps else line)
+                continue
+            if in_fence:
+                lines.append(line)
+                continue
+            if STEP_COMMENTS in steps and comment_prefix and line.lstrip().startswith(comment_prefix):
+                continue
+            if STEP_WHITESPACE in steps:
+                line = _INNER_SPACES.sub(" ", line.rstrip())
+            if STEP_LISTS in steps:
+                line = _BULLET.sub(r"\1- ", line)
+                line = _NUMBERED.sub(r"\1\2. ", line)
+            lines.append(line)
+
+        if STEP_WHITESPACE not in steps and STEP_DEDUPE not in steps:
+            return "\n".join(lines)
+
+        # 按空行划分段落，代码块内的空行不作为分隔
+        paragraphs: List[str] = []
+        current: List[str] = []
+        in_fence = False
+        for line in lines:
+            fence = bool(_FENCE.match(line))
+            if fence:
+                in_fence = not in_fence
+            if not in_fence and not fence and not line.strip():
+                if current:
+                    paragraphs.append("\n".join(current))
+                    current = []
+                continue
+            current.append(line)
+        if current:
+            paragraphs.append("\n".join(current))
+
+        if STEP_DEDUPE in steps:
+            seen = set()
+            unique = []
+            for paragraph in paragraphs:
+                key = " ".join(paragraph.split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                unique.append(paragraph)
+            paragraphs = unique
+        return "\n\n".join(paragraphs)
@@ -0,0 +1,140 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.log import logger
+
+from .promptstore import text_hash
+
+# 引用片段的指令，独占一行：{{include 片段名称}}
+INCLUDE_PATTERN = re.compile(r"^[ \t]*\{\{\s*include\s+([^{}\n]+?)\s*\}\}[ \t]*$", re.MULTILINE)
+
+
+class PromptComposer:
+    """
+    提示词片段组合：提示词与片段中的引用指令替换为对应片段的内容，片段可以继续引用其他片段。
+    按片段记录内容哈希与引用关系，片段变化时只重新生成该片段及直接或间接引用它的片段
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # 片段名称 -> 原文
+        self._sources: Dict[str, str] = {}
+        # 片段名称 -> 原文哈希
+        self._hashes: Dict[str, str] = {}
+        # 片段名称 -> 展开引用后的内容
+        self._rendered: Dict[str, str] = {}
+        # 片段名称 -> 引用的片段
+        self._deps: Dict[str, Tuple[str, ...]] = {}
+        # 片段名称 -> 引用它的片段，包括尚不存在的片段
+        self._rdeps: Dict[str, Set[str]] = {}
+        # 片段变化次数，用于判断组合结果缓存是否有效
+        self._generation = 0
+        # 最近一次组合结果：(原文哈希, 片段变化次数, 组合结果)
+        self._composed: Optional[Tuple[str, int, str]] = None
+        # 累计重新生成的片段数
+        self.renders = 0
+        # 最近一次更新时失效的片段
+        self.invalidated: List[str] = []
+
+    @staticmethod
+    def has_includes(text: Optional[str]) -> bool:
+        """
+        文本中是否包含引用指令
+        """
+        return bool(text) and "{{" in text and INCLUDE_PATTERN.search(text) is not None
+
+    def update(self, fragments: Dict[str, str]) -> List[str]:
+        """
+        更新片段，内容变化、新增或删除的片段及引用它们的片段需要重新生成
+        :return: 失效的片段名称
+        """
+        hashes = {name: text_hash(text) for name, text in fragments.items()}
+        with self._lock:
+            changed = [name for name in set(self._hashes) | set(hashes)
+                       if self._hashes.get(name) != hashes.get(name)]
+            stale: Set[str] = set()
+            queue = list(changed)
+            while queue:
+                name = queue.pop()
+                if name in stale:
+                    continue
+                stale.add(name)
+                queue.extend(self._rdeps.get(name, ()))
+            for name in stale:
+                self._rendered.pop(name, None)
+                for dep in self._deps.pop(name, ()):
+                    self._rdeps.get(dep, set()).discard(name)
+            self._sources = dict(fragments)
+            self._hashes = hashes
+            if changed:
+                self._generation += 1
+            self.invalidated = sorted(stale)
+            return self.invalidated
+
+    def render(self, name: str) -> Optional[str]:
+        """
+        展开片段中的引用，片段不存在时返回None
+        """
+        with self._lock:
+            return self.__render(name, ())
+
+    def compose(self, text: Optional[str]) -> Optional[str]:
+        """
+        展开提示词中的引用，不含引用指令时原样返回
+        """
+        if not self.has_includes(text):
+            return text
+        digest = text_hash(text)
+        with self._lock:
+            if self._composed and self._composed[:2] == (digest, self._generation):
+                return self._composed[2]
+            composed = self.__expand(text, ())[0]
+            self._composed = (digest, self._generation, composed)
+            return composed
+
+    def __render(self, name: str, stack: Tuple[str, ...]) -> Optional[str]:
+        rendered = self._rendered.get(name)
+        if rendered is not None:
+            return rendered
+        source = self._sources.get(name)
+        if source is None:
+            logger.warning(f"提示词片段 {name} 不存在，已忽略")
+            return None
+        if name in stack:
+            logger.error(f"提示词片段循环引用：{' -> '.join(stack + (name,))}，已忽略")
+            return None
+        rendered, deps = self.__expand(source, stack + (name,))
+        self._rendered[name] = rendered
+        self._deps[name] = deps
+        for dep in deps:
+            self._rdeps.setdefault(dep, set()).add(name)
+        self.renders += 1
+        return rendered
+
+    def __expand(self, text: str, stack: Tuple[str, ...]) -> Tuple[str, Tuple[str, ...]]:
+        """
+        替换引用指令，返回替换结果与引用的片段
+        """
+        deps: List[str] = []
+
+        def _include(match: re.Match) -> str:
+            dep = match.group(1)
+            if dep not in deps:
+                deps.append(dep)
+            return self.__render(dep, stack) or ""
+
+        return INCLUDE_PATTERN.sub(_include, text), tuple(deps)
+
+    def graph(self) -> List[Dict[str, Any]]:
+        """
+        片段列表及引用关系
+        """
+        with self._lock:
+            return [{
+                "name": name,
+                "hash": self._hashes[name],
+                "includes": list(self._deps.get(name, ())),
+                "included_by": sorted(self._rdeps.get(name, ())),
+                "cached": name in self._rendered,
+            } for name in self._sources]
@@ -0,0 +1,231 @@
+import base64
+import difflib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .promptstore import text_hash
+
+# 快照类型
+KIND_SNAPSHOT = "snapshot"
+KIND_DELTA = "delta"
+
+
+def _pack(data: Any) -> str:
+    """
+    JSON序列化后压缩并转为base64
+    """
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw, 9)).decode("ascii")
+
+
+def _unpack(data: str) -> Any:
+    return json.loads(zlib.decompress(base64.b64decode(data)).decode("utf-8"))
+
+
+def make_delta(base: str, target: str) -> List[Union[List[int], str]]:
+    """
+    按行计算差异：[起始行, 结束行]表示复制基准版本的行，字符串表示新增内容
+    """
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    ops: List[Union[List[int], str]] = []
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(target_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(base: str, ops: List[Union[List[int], str]]) -> str:
+    """
+    将差异应用到基准版本
+    """
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return "".join(parts)
+
+
+class PromptHistory:
+    """
+    提示词版本历史：定期保存完整快照，其余版本保存与上一版本的压缩差异，
+    还原任一版本最多读取一个快照加一段较短的差异链；超出保留数量或大小时删除最旧版本
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None,
+                 save: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 limit: int = 50, max_bytes: int = 512 * 1024, snapshot_interval: int = 10):
+        """
+        :param data: 已保存的历史数据
+        :param save: 历史变化后的保存回调
+        :param limit: 最多保留的版本数
+        :param max_bytes: 历史数据最大字节数
+        :param snapshot_interval: 每隔多少个版本保存一次完整快照
+        """
+        data = data or {}
+        self._entries: List[Dict[str, Any]] = list(data.get("entries") or [])
+        self._next_id: int = int(data.get("next_id") or 1)
+        self._save = save
+        self._lock = threading.RLock()
+        # 最近还原的版本内容
+        self._texts: "OrderedDict[int, str]" = OrderedDict()
+        self._snapshot_interval = max(1, snapshot_interval)
+        self.limit = 1
+        self.max_bytes = 0
+        self.configure(limit, max_bytes)
+
+    def configure(self, limit: int, max_bytes: int):
+        """
+        更新保留数量与大小，超出时立即清理
+        """
+        with self._lock:
+            self.limit = max(1, limit)
+            self.max_bytes = max(0, max_bytes)
+            if self.__prune():
+                self.__persist()
+
+    def record(self, text: str, label: str = "") -> Optional[int]:
+        """
+        记录新版本，与最新版本内容一致时不记录
+        :return: 新版本号
+        """
+        digest = text_hash(text)
+        with self._lock:
+            latest = self._entries[-1] if self._entries else None
+            if latest and latest["hash"] == digest:
+                return None
+            entry = {
+                "id": self._next_id,
+                "time": int(time.time()),
+                "label": label,
+                "hash": digest,
+                "chars": len(text),
+            }
+            snapshot = _pack(text)
+            since_snapshot = self.__since_snapshot()
+            if latest and since_snapshot < self._snapshot_interval:
+                delta = _pack(make_delta(self.get(latest["id"]), text))
+                # 差异不比快照小时直接保存快照
+                if len(delta) < len(snapshot):
+                    entry.update(kind=KIND_DELTA, data=delta)
+            if "data" not in entry:
+                entry.update(kind=KIND_SNAPSHOT, data=snapshot)
+            self._entries.append(entry)
+            self._next_id += 1
+            self.__remember(entry["id"], text)
+            self.__prune()
+            self.__persist()
+            return entry["id"]
+
+    def get(self, version: int) -> Optional[str]:
+        """
+        还原指定版本内容，版本不存在时返回None
+        """
+        with self._lock:
+            if version in self._texts:
+                self._texts.move_to_end(version)
+                return self._texts[version]
+            index = self.__index(version)
+            if index is None:
+                return None
+            # 向前找到最近的快照或已还原的版本
+            start = index
+            while self._entries[start]["kind"] != KIND_SNAPSHOT and self._entries[start]["id"] not in self._texts:
+                start -= 1
+            text = None
+            for entry in self._entries[start:index + 1]:
+                if entry["id"] in self._texts:
+                    text = self._texts[entry["id"]]
+                elif entry["kind"] == KIND_SNAPSHOT:
+                    text = _unpack(entry["data"])
+                else:
+                    text = apply_delta(text, _unpack(entry["data"]))
+            self.__remember(version, text)
+            return text
+
+    def latest(self) -> Optional[int]:
+        """
+        最新版本号
+        """
+        with self._lock:
+            return self._entries[-1]["id"] if self._entries else None
+
+    def versions(self) -> List[Dict[str, Any]]:
+        """
+        版本列表（不含内容），按时间倒序
+        """
+        with self._lock:
+            return [dict({key: value for key, value in entry.items() if key != "data"},
+                         size=len(entry["data"]))
+                    for entry in reversed(self._entries)]
+
+    def diff(self, old: int, new: Optional[int] = None, context: int = 3) -> Optional[str]:
+        """
+        生成两个版本之间的统一格式差异，new为空时与最新版本对比
+        """
+        new = new or self.latest()
+        old_text, new_text = self.get(old), self.get(new) if new else None
+        if old_text is None or new_text is None:
+            return None
+        return "".join(difflib.unified_diff(old_text.splitlines(keepends=True),
+                                            new_text.splitlines(keepends=True),
+                                            fromfile=f"v{old}", tofile=f"v{new}", n=context))
+
+    @property
+    def size(self) -> int:
+        """
+        历史数据大小
+        """
+        with self._lock:
+            return sum(len(entry["data"]) for entry in self._entries)
+
+    def __since_snapshot(self) -> int:
+        count = 0
+        for entry in reversed(self._entries):
+            if entry["kind"] == KIND_SNAPSHOT:
+                return count + 1
+            count += 1
+        return self._snapshot_interval
+
+    def __index(self, version: int) -> Optional[int]:
+        for index in range(len(self._entries) - 1, -1, -1):
+            if self._entries[index]["id"] == version:
+                return index
+        return None
+
+    def __remember(self, version: int, text: str):
+        self._texts[version] = text
+        self._texts.move_to_end(version)
+        while len(self._texts) > 4:
+            self._texts.popitem(last=False)
+
+    def __prune(self) -> bool:
+        """
+        删除超出数量或大小的最旧版本，保留至少一个版本，并保证第一个版本为快照
+        """
+        changed = False
+        while len(self._entries) > 1 and (len(self._entries) > self.limit
+                                          or (self.max_bytes and self.size > self.max_bytes)):
+            first = self._entries[1]
+            if first["kind"] == KIND_DELTA:
+                # 删除旧快照前，将下一个版本转为快照
+                text = self.get(first["id"])
+                first.update(kind=KIND_SNAPSHOT, data=_pack(text))
+            removed = self._entries.pop(0)
+            self._texts.pop(removed["id"], None)
+            changed = True
+        return changed
+
+    def __persist(self):
+        if self._save:
+            self._save({"entries": self._entries, "next_id": self._next_id})
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+
+def text_hash(text: Optional[str]) -> str:
+    """
+    计算文本内容哈希
+    """
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class PromptStore:
+    """
+    提示词文件的内存缓存：保存当前内容及其哈希，
+    仅在文件修改时间或大小变化时重新读取，内容未变化时跳过写入
+    """
+
+    def __init__(self, path: Union[Path, Callable[[], Path]]):
+        """
+        :param path: 提示词文件路径，或首次使用时才调用的路径获取函数
+        """
+        self._path = path
+        self._lock = threading.RLock()
+        self._text: Optional[str] = None
+        self._hash: Optional[str] = None
+        # (修改时间, 大小)
+        self._stat: Optional[Tuple[int, int]] = None
+
+    @property
+    def path(self) -> Path:
+        """
+        提示词文件路径
+        """
+        if callable(self._path):
+            self._path = self._path()
+        return self._path
+
+    def __revalidate(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._text, self._hash, self._stat = None, None, None
+            return
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self._stat:
+            self._text = self.path.read_text(encoding="utf-8")
+            self._hash = text_hash(self._text)
+            self._stat = key
+
+    def read(self) -> Optional[str]:
+        """
+        获取提示词文件内容，文件不存在时返回None
+        """
+        with self._lock:
+            self.__revalidate()
+            return self._text
+
+    @property
+    def hash(self) -> Optional[str]:
+        """
+        提示词文件内容哈希
+        """
+        with self._lock:
+            self.__revalidate()
+            return self._hash
+
+    def write(self, text: str) -> bool:
+        """
+        写入提示词文件，内容与文件一致时跳过；先写入临时文件再替换，避免读到写了一半的内容
+        :return: 是否写入了文件
+        """
+        digest = text_hash(text)
+        with self._lock:
+            self.__revalidate()
+            if digest == self._hash:
+                return False
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_text(text, encoding="utf-8")
+                if self._stat is not None:
+                    # 保留原文件权限
+                    os.chmod(tmp, os.stat(self.path).st_mode & 0o7777)
+                os.replace(tmp, self.path)
+            finally:
+                if tmp.exists():
+                    tmp.unlink()
+            stat = os.stat(self.path)
+            self._text, self._hash, self._stat = text, digest, (stat.st_mtime_ns, stat.st_size)
+            return True
@@ -0,0 +1,67 @@
+import copy
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.log import logger
+
+
+class PromptWarmer:
+    """
+    替换提示词后在后台重建提示词缓存：新提示词加载完成前继续使用旧缓存，
+    加载完成后整体替换缓存项
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # 最近一次预热结果
+        self.last: Dict[str, Any] = {}
+
+    def refresh(self, manager: Any, prompt_name: str):
+        """
+        在后台重建提示词缓存
+        :param manager: 提示词管理器
+        :param prompt_name: 提示词文件名
+        """
+        with self._lock:
+            thread = threading.Thread(target=self.__run, args=(manager, prompt_name),
+                                      name="CustomAgentPrompt-warmup", daemon=True)
+            self._thread = thread
+        thread.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        等待预热完成
+        """
+        thread = self._thread
+        if thread:
+            thread.join(timeout)
+
+    def __run(self, manager: Any, prompt_name: str):
+        start = time.perf_counter()
+        try:
+            cache = getattr(manager, "prompts_cache", None)
+            if isinstance(cache, dict) and hasattr(manager, "load_prompt"):
+                # 使用独立缓存加载新提示词，再替换到正在使用的缓存中
+                fresh = copy.copy(manager)
+                fresh.prompts_cache = {}
+                content = fresh.load_prompt(prompt_name)
+                if threading.current_thread() is not self._thread:
+                    # 已有更新的预热任务
+                    return
+                cache[prompt_name] = content
+                mode = "swap"
+            else:
+                # 无法识别缓存结构时退回清空缓存并立即重新加载
+                manager.clear_cache()
+                if hasattr(manager, "load_prompt"):
+                    manager.load_prompt(prompt_name)
+                mode = "clear"
+        except Exception as e:
+            logger.error(f"提示词缓存预热失败，清空缓存：{e}")
+            manager.clear_cache()
+            mode = "failed"
+        duration = round((time.perf_counter() - start) * 1000, 2)
+        self.last = {"time": time.time(), "duration_ms": duration, "mode": mode}
+        logger.info(f"提示词缓存预热完成，耗时 {duration} ms")
@@ -0,0 +1,145 @@
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.log import logger
+
+# inotify 事件类型
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PromptWatcher:
+    """
+    监听提示词文件变化：优先使用inotify监听所在目录，不可用时低频轮询文件状态，
+    连续变化在防抖时间内合并为一次回调
+    """
+
+    def __init__(self, path: Path, on_change: Callable[[], None],
+                 poll_interval: float = 30.0, debounce: float = 2.0):
+        """
+        :param path: 监听的文件
+        :param on_change: 文件变化后的回调
+        :param poll_interval: 轮询间隔（秒），仅在inotify不可用时使用
+        :param debounce: 防抖时间（秒）
+        """
+        self.path = path
+        self._on_change = on_change
+        self._poll_interval = max(1.0, poll_interval)
+        self._debounce = max(0.0, debounce)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.mode: Optional[str] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        fd = self.__inotify_init()
+        self.mode = "inotify" if fd is not None else "poll"
+        target = self.__watch_inotify if fd is not None else self.__watch_poll
+        self._thread = threading.Thread(target=target, args=(fd,) if fd is not None else (),
+                                        name="CustomAgentPrompt-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"开始监听提示词文件变化（{self.mode}）：{self.path}")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __inotify_init(self) -> Optional[int]:
+        """
+        初始化inotify并监听文件所在目录，不可用时返回None
+        """
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+            if libc.inotify_add_watch(fd, str(self.path.parent).encode(), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def __watch_inotify(self, fd: int):
+        name = self.path.name.encode()
+        try:
+            while not self._stop_event.is_set():
+                if not self.__wait_inotify(fd, name, timeout=1.0):
+                    continue
+                # 等待连续变化结束
+                while self.__wait_inotify(fd, name, timeout=self._debounce):
+                    if self._stop_event.is_set():
+                        return
+                self.__fire()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def __wait_inotify(fd: int, name: bytes, timeout: float) -> bool:
+        """
+        等待目标文件的inotify事件
+        """
+        readable, _, _ = select.select([fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        matched = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if data[offset:offset + length].rstrip(b"\0") == name:
+                matched = True
+            offset += length
+        return matched
+
+    def __watch_poll(self):
+        last = self.__stat()
+        while not self._stop_event.wait(self._poll_interval):
+            current = self.__stat()
+            if current == last:
+                continue
+            # 等待连续变化结束
+            while not self._stop_event.wait(self._debounce):
+                latest = self.__stat()
+                if latest == current:
+                    break
+                current = latest
+            last = current
+            self.__fire()
+
+    def __stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size, stat.st_ino
+        except FileNotFoundError:
+            return None
+
+    def __fire(self):
+        if self._stop_event.is_set():
+            return
+        try:
+            self._on_change()
+        except Exception as e:
+            logger.error(f"处理提示词文件变化失败：{e}")
@@ -1,9 +1,59 @@
-from typing import Any, List, Dict, Tuple, Optional
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, List, Dict, Tuple, Optional, Union, TYPE_CHECKING
 
 from app.core.event import eventmanager, Event
 from app.log import logger
 from app.plugins import _PluginBase
-from app.schemas.types import EventType
+from app.schemas.types import EventType, MessageChannel
+
+from .chunker import TextChunker
+from .configstore import ConfigPersister
+from .delivery import ReplyDispatcher
+from .matcher import MatchRule, ReplyMatcher
+from .metrics import ReplyMetrics
+from .ratelimit import DedupeWindow, RateLimiter
+from .scheduler import MessageScheduler, Schedule
+from .template import compile_template, FileTemplate, MessageTemplate
+
+if TYPE_CHECKING:
+    from .broadcast import Broadcaster
+    from .mediacache import MediaCache
+
+
+# 默认命令对应的动作
+DEFAULT_ACTION = "custom_cmdmsg"
+# 群发命令对应的动作
+BROADCAST_ACTION = "custom_broadcast"
+AUTO_REPLY_ACTION = "custom_autoreply"
+
+
+@dataclass(frozen=True)
+class CmdReply:
+    """
+    单条命令的回复内容
+    """
+    cmd: str
+    action: str
+    desc: str
+    title: Optional[str] = None
+    text: Optional[str] = None
+    image: Optional[str] = None
+    link: Optional[str] = None
+    # 预编译的消息模板
+    title_tpl: Union[MessageTemplate, FileTemplate] = field(init=False, repr=False, compare=False)
+    text_tpl: Union[MessageTemplate, FileTemplate] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "title_tpl", compile_template(self.title))
+        object.__setattr__(self, "text_tpl", compile_template(self.text))
+
 
 class CustomCmdMsg(_PluginBase):
     # 插件名称
@@ -13,7 +63,7 @@ class CustomCmdMsg(_PluginBase):
     # 插件图标
     plugin_icon = "Wecom_A.png"
     # 插件版本
-    plugin_version = "1.1"
+    plugin_version = "2.4"
     # 插件作者
     plugin_author = "viklion"
     # 作者主页
@@ -31,9 +81,70 @@ class CustomCmdMsg(_PluginBase):
     _msg_text: Optional[str] = None
     _msg_image: Optional[str] = None
     _msg_link: Optional[str] = None
+    _cmd_table: Optional[str] = None
+    _async_send: bool = False
+    _send_workers: int = 2
+    _send_queue_size: int = 100
+    _send_overflow: str = ReplyDispatcher.DROP_OLDEST
+    _send_block_timeout: float = 5.0
+    _media_cache: bool = False
+    _media_cache_channels: List[str] = []
+    _media_cache_size: int = 50
+    _dedupe_window: float = 3.0
+    _user_rate: int = 0
+    _user_burst: int = 3
+    _global_rate: int = 0
+    _global_burst: int = 10
+    _broadcast_targets: Optional[str] = None
+    _broadcast_admins: Optional[str] = None
+    _broadcast_batch_size: int = 20
+    _broadcast_rate: float = 5.0
+    _broadcast_concurrency: int = 4
+    _broadcast_retries: int = 3
+    _chunk_enabled: bool = False
+    _chunk_limits: Optional[str] = None
+    _chunk_retries: int = 2
+    _schedules: Optional[str] = None
+    _auto_replies: Optional[str] = None
 
+    # 异步投递器
+    _dispatcher: Optional[ReplyDispatcher] = None
+    # 图片缓存
+    _media: Optional["MediaCache"] = None
+    # 命令调用计数
+    _counters: Optional[Counter] = None
+    _counter_total: int = 0
+    _counter_lock: Optional[threading.Lock] = None
+    # 重复事件过滤与限流
+    _dedupe: Optional[DedupeWindow] = None
+    _user_limiter: Optional[RateLimiter] = None
+    _global_limiter: Optional[RateLimiter] = None
+    # 被过滤的事件计数
+    _suppressed: Optional[Counter] = None
+    # 回复统计
+    _metrics: Optional[ReplyMetrics] = None
+    # 群发
+    _broadcaster: Optional["Broadcaster"] = None
+    # 长消息分段
+    _chunker: Optional[TextChunker] = None
+    # 定时消息
+    _scheduler: Optional[MessageScheduler] = None
+    # 自动回复匹配
+    _matcher: Optional[ReplyMatcher] = None
+    _matcher_key: Optional[str] = None
+    # 命令索引：动作 -> 回复内容
+    _cmd_index: Dict[str, CmdReply] = {}
+    # 已注册的命令列表
+    _commands: List[Dict[str, Any]] = []
+    # 构建索引时的配置指纹
+    _cmd_index_key: Optional[str] = None
+    # 配置保存
+    _config_persister = ConfigPersister()
 
     def init_plugin(self, config: dict = None):
+        # 停止现有任务
+        self.stop_service()
+
         # 配置
         if config:
             self._enabled = config.get("enabled", False)
@@ -41,48 +152,457 @@ class CustomCmdMsg(_PluginBase):
             self._msg_text = config.get("msg_text", None)
             self._msg_image = config.get("msg_image", None)
             self._msg_link = config.get("msg_link", None)
+            self._cmd_table = config.get("cmd_table", None)
+            self._async_send = config.get("async_send", False)
+            self._send_workers = self.__to_int(config.get("send_workers"), 2)
+            self._send_queue_size = self.__to_int(config.get("send_queue_size"), 100)
+            self._send_overflow = config.get("send_overflow") or ReplyDispatcher.DROP_OLDEST
+            self._send_block_timeout = self.__to_float(config.get("send_block_timeout"), 5.0)
+            self._media_cache = config.get("media_cache", False)
+            self._media_cache_channels = config.get("media_cache_channels") or []
+            self._media_cache_size = self.__to_int(config.get("media_cache_size"), 50)
+            self._dedupe_window = self.__to_float(config.get("dedupe_window"), 3.0)
+            self._user_rate = self.__to_int(config.get("user_rate"), 0)
+            self._user_burst = self.__to_int(config.get("user_burst"), 3)
+            self._global_rate = self.__to_int(config.get("global_rate"), 0)
+            self._global_burst = self.__to_int(config.get("global_burst"), 10)
+            self._broadcast_targets = config.get("broadcast_targets", None)
+            self._broadcast_admins = config.get("broadcast_admins", None)
+            self._broadcast_batch_size = self.__to_int(config.get("broadcast_batch_size"), 20)
+            self._broadcast_rate = self.__to_float(config.get("broadcast_rate"), 5.0)
+            self._broadcast_concurrency = self.__to_int(config.get("broadcast_concurrency"), 4)
+            self._broadcast_retries = self.__to_int(config.get("broadcast_retries"), 3)
+            self._chunk_enabled = config.get("chunk_enabled", False)
+            self._chunk_limits = config.get("chunk_limits", None)
+            self._chunk_retries = self.__to_int(config.get("chunk_retries"), 2)
+            self._schedules = config.get("schedules", None)
+            self._auto_replies = config.get("auto_replies", None)
 
             # 保存配置
             self.__update_config()
 
+        # 构建命令索引
+        self.__build_cmd_index()
+
+        # 自动回复规则
+        self.__build_matcher()
+
+        # 调用与过滤计数，重新加载配置时保留
+        if self._counters is None:
+            self._counter_lock = threading.Lock()
+            self._counters, self._counter_total, self._suppressed = Counter(), 0, Counter()
+
+        # 回复统计，重新加载配置时保留
+        if self._metrics is None:
+            self._metrics = ReplyMetrics()
+
+        # 异步投递
+        if self._enabled and self._async_send:
+            self._dispatcher = ReplyDispatcher(handler=self.__send_reply,
+                                               workers=self._send_workers,
+                                               maxsize=self._send_queue_size,
+                                               overflow=self._send_overflow,
+                                               block_timeout=self._send_block_timeout,
+                                               name="CustomCmdMsg")
+            logger.info(f"已开启异步回复，线程数：{self._send_workers}，队列长度：{self._send_queue_size}")
+
+        # 重复事件过滤与限流，速率单位为次/分钟
+        self._dedupe = DedupeWindow(window=self._dedupe_window) if self._dedupe_window > 0 else None
+        self._user_limiter = RateLimiter(rate=self._user_rate / 60, burst=self._user_burst) \
+            if self._user_rate > 0 else None
+        self._global_limiter = RateLimiter(rate=self._global_rate / 60, burst=self._global_burst, capacity=1) \
+            if self._global_rate > 0 else None
+
+        # 长消息分段
+        self._chunker = TextChunker(TextChunker.parse_limits(self._chunk_limits)) if self._chunk_enabled else None
+
+        # 群发
+        if self._enabled and self._broadcast_targets:
+            from .broadcast import Broadcaster
+            self._broadcaster = Broadcaster(batch_size=self._broadcast_batch_size,
+                                            rate=self._broadcast_rate,
+                                            concurrency=self._broadcast_concurrency,
+                                            retries=self._broadcast_retries)
+
+        # 图片缓存
+        if self._enabled and self._media_cache and self._media_cache_channels:
+            from .mediacache import MediaCache
+            self._media = MediaCache(cache_dir=self.get_data_path() / "media",
+                                     max_bytes=self._media_cache_size * 1024 * 1024)
+            # 后台预先缓存所有已配置的图片
+            images = {reply.image for reply in self._cmd_index.values() if reply.image}
+            # 绑定当前实例，重新加载或停用后后台任务不会使用新实例或None
+            media = self._media
+            threading.Thread(target=lambda: [media.resolve(image) for image in images],
+                             name="CustomCmdMsg-media", daemon=True).start()
+        else:
+            self._media = None
+
+        # 定时消息
+        if self._enabled:
+            schedules = self.__parse_schedules(self._schedules)
+            if schedules:
+                self._scheduler = MessageScheduler(send=self.__send_scheduled)
+                count = self._scheduler.load(schedules)
+                logger.info(f"已加载{count}个定时消息，下次发送时间：{self._scheduler.next_run()}")
+
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def __to_float(value: Any, default: float) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    def __build_cmd_index(self):
+        """
+        构建命令索引，配置未变化时复用已有索引
+        """
+        key = hashlib.sha1(json.dumps(
+            [self._msg_title, self._msg_text, self._msg_image, self._msg_link, self._cmd_table,
+             bool(self._broadcast_targets)],
+            ensure_ascii=False).encode("utf-8")).hexdigest()
+        if key == self._cmd_index_key:
+            return
+
+        replies = [CmdReply(cmd="/custom_cmdmsg",
+                            action=DEFAULT_ACTION,
+                            desc="自定义回复",
+                            title=self._msg_title,
+                            text=self._msg_text,
+                            image=self._msg_image,
+                            link=self._msg_link)]
+        replies.extend(self.__parse_cmd_table(self._cmd_table))
+
+        index: Dict[str, CmdReply] = {}
+        commands: List[Dict[str, Any]] = []
+        for reply in replies:
+            if reply.action in index:
+                logger.warning(f"命令 {reply.cmd} 重复，已忽略")
+                continue
+            index[reply.action] = reply
+            commands.append({
+                "cmd": reply.cmd,
+                "event": EventType.PluginAction,
+                "desc": reply.desc,
+                "category": "",
+                "data": {
+                    "action": reply.action
+                }
+            })
+
+        if self._broadcast_targets:
+            commands.append({
+                "cmd": "/custom_broadcast",
+                "event": EventType.PluginAction,
+                "desc": "群发自定义消息",
+                "category": "",
+                "data": {
+                    "action": BROADCAST_ACTION
+                }
+            })
+
+        self._cmd_index = index
+        self._commands = commands
+        self._cmd_index_key = key
+        logger.info(f"命令索引已更新，共 {len(index)} 条命令")
+
+    @staticmethod
+    def __parse_cmd_table(cmd_table: Optional[str]) -> List[CmdReply]:
+        """
+        解析命令表配置，格式为JSON数组
+        """
+        if not cmd_table or not cmd_table.strip():
+            return []
+        try:
+            items = json.loads(cmd_table)
+        except ValueError as e:
+            logger.error(f"命令表解析失败：{e}")
+            return []
+        if not isinstance(items, list):
+            logger.error("命令表格式错误，应为JSON数组")
+            return []
+
+        replies = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            cmd = str(item.get("cmd") or "").strip()
+            if not cmd:
+                continue
+            if not cmd.startswith("/"):
+                cmd = f"/{cmd}"
+            if not item.get("title") and not item.get("text"):
+                logger.warning(f"命令 {cmd} 的消息主题与文本内容均为空，已忽略")
+                continue
+            replies.append(CmdReply(cmd=cmd,
+                                    action=f"{DEFAULT_ACTION}_{cmd.lstrip('/')}",
+                                    desc=item.get("desc") or cmd,
+                                    title=item.get("title"),
+                                    text=item.get("text"),
+                                    image=item.get("image"),
+                                    link=item.get("link")))
+        return replies
+
+    @staticmethod
+    def __parse_broadcast_targets(targets: Optional[str]) -> Dict[MessageChannel, List[Optional[str]]]:
+        """
+        解析群发对象，每行格式为 渠道:用户1,用户2，用户为*或留空时发送给渠道的默认接收人
+        """
+        result: Dict[MessageChannel, List[Optional[str]]] = {}
+        for line in (targets or "").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, _, users = line.partition(":")
+            name = name.strip()
+            channel = MessageChannel.__members__.get(name) \
+                or next((c for c in MessageChannel if c.value == name), None)
+            if not channel:
+                logger.warning(f"群发渠道 {name} 不存在，已忽略")
+                continue
+            userids = result.setdefault(channel, [])
+            for userid in users.split(","):
+                userid = userid.strip()
+                value = None if userid in ("", "*") else userid
+                if value not in userids:
+                    userids.append(value)
+        return result
+
+    def __build_matcher(self):
+        """
+        将自动回复规则编译为匹配器，配置未变化时复用已有匹配器
+        """
+        if not self._enabled or not self._auto_replies or not self._auto_replies.strip():
+            self._matcher, self._matcher_key = None, None
+            return
+        key = hashlib.sha1(self._auto_replies.encode("utf-8")).hexdigest()
+        if key == self._matcher_key:
+            return
+        try:
+            items = json.loads(self._auto_replies)
+        except ValueError as e:
+            logger.error(f"自动回复规则解析失败：{e}")
+            self._matcher, self._matcher_key = None, None
+            return
+        if not isinstance(items, list):
+            logger.error("自动回复规则格式错误，应为JSON数组")
+            self._matcher, self._matcher_key = None, None
+            return
+
+        rules: List[MatchRule] = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            if not item.get("title") and not item.get("text"):
+                logger.warning(f"第{index + 1}条自动回复规则的消息主题与文本内容均为空，已忽略")
+                continue
+            keywords = item.get("keywords") or item.get("keyword") or []
+            regexes = item.get("regex") or []
+            keywords = [keywords] if isinstance(keywords, str) else keywords
+            regexes = [regexes] if isinstance(regexes, str) else regexes
+            name = item.get("name") or (keywords or regexes or [""])[0]
+            reply = CmdReply(cmd=f"自动回复:{name}",
+                             action=f"{AUTO_REPLY_ACTION}_{index}",
+                             desc=name,
+                             title=item.get("title"),
+                             text=item.get("text"),
+                             image=item.get("image"),
+                             link=item.get("link"))
+            priority = self.__to_int(item.get("priority"), 0)
+            ignore_case = item.get("ignore_case", True)
+            rules.extend(MatchRule(pattern=str(pattern), value=reply, regex=is_regex,
+                                   priority=priority, ignore_case=ignore_case)
+                         for patterns, is_regex in ((keywords, False), (regexes, True))
+                         for pattern in patterns if pattern)
+
+        try:
+            self._matcher = ReplyMatcher(rules) if rules else None
+        except Exception as e:
+            logger.error(f"自动回复规则编译失败：{e}")
+            self._matcher, self._matcher_key = None, None
+            return
+        self._matcher_key = key
+        logger.info(f"自动回复规则已更新，共 {len(rules)} 个关键词与正则")
+
+    def __parse_schedules(self, schedules: Optional[str]) -> List[Schedule]:
+        """
+        解析定时消息配置，格式为JSON数组，未配置发送对象时使用群发对象
+        """
+        if not schedules or not schedules.strip():
+            return []
+        try:
+            items = json.loads(schedules)
+        except ValueError as e:
+            logger.error(f"定时消息解析失败：{e}")
+            return []
+        if not isinstance(items, list):
+            logger.error("定时消息格式错误，应为JSON数组")
+            return []
+
+        result = []
+        for item in items:
+            if not isinstance(item, dict) or not str(item.get("cron") or "").strip():
+                continue
+            action = self.__cmd_action(item.get("cmd"))
+            if action not in self._cmd_index:
+                logger.warning(f"定时消息的命令 {item.get('cmd')} 不存在，已忽略")
+                continue
+            targets = item.get("targets") or self._broadcast_targets
+            if isinstance(targets, list):
+                targets = "\n".join(str(target) for target in targets)
+            parsed = self.__parse_broadcast_targets(targets)
+            if not parsed:
+                logger.warning(f"定时消息 {item['cron']} 未配置发送对象，已忽略")
+                continue
+            result.append(Schedule(cron=str(item["cron"]).strip(),
+                                   key=action,
+                                   targets={channel: tuple(users) for channel, users in parsed.items()}))
+        return result
+
     def __update_config(self):
         # 保存配置
-        self.update_config(
+        self._config_persister.persist(
+            self,
             {
                 "enabled": self._enabled,
                 "msg_title": self._msg_title,
                 "msg_text": self._msg_text,
                 "msg_image": self._msg_image,
                 "msg_link": self._msg_link,
+                "cmd_table": self._cmd_table,
+                "async_send": self._async_send,
+                "send_workers": self._send_workers,
+                "send_queue_size": self._send_queue_size,
+                "send_overflow": self._send_overflow,
+                "send_block_timeout": self._send_block_timeout,
+                "media_cache": self._media_cache,
+                "media_cache_channels": self._media_cache_channels,
+                "media_cache_size": self._media_cache_size,
+                "dedupe_window": self._dedupe_window,
+                "user_rate": self._user_rate,
+                "user_burst": self._user_burst,
+                "global_rate": self._global_rate,
+                "global_burst": self._global_burst,
+                "broadcast_targets": self._broadcast_targets,
+                "broadcast_admins": self._broadcast_admins,
+                "broadcast_batch_size": self._broadcast_batch_size,
+                "broadcast_rate": self._broadcast_rate,
+                "broadcast_concurrency": self._broadcast_concurrency,
+                "broadcast_retries": self._broadcast_retries,
+                "chunk_enabled": self._chunk_enabled,
+                "chunk_limits": self._chunk_limits,
+                "chunk_retries": self._chunk_retries,
+                "schedules": self._schedules,
+                "auto_replies": self._auto_replies,
             }
         )
 
     def get_state(self) -> bool:
         return self._enabled
 
-    @staticmethod
-    def get_command() -> List[Dict[str, Any]]:
+    def get_command(self) -> List[Dict[str, Any]]:
         """
         定义远程控制命令
         :return: 命令关键字、事件、描述、附带数据
         """
+        return self._commands
+
+    def get_api(self) -> List[Dict[str, Any]]:
         return [{
-            "cmd": "/custom_cmdmsg",
-            "event": EventType.PluginAction,
-            "desc": "自定义回复",
-            "category": "",
-            "data": {
-                "action": "custom_cmdmsg"
-            }
+            "path": "/stats",
+            "endpoint": self.get_stats,
+            "methods": ["GET"],
+            "summary": "回复统计",
+            "description": "按命令、渠道统计回复次数、错误数与延迟分布",
+        }, {
+            "path": "/broadcast",
+            "endpoint": self.api_broadcast,
+            "methods": ["POST"],
+            "summary": "群发消息",
+            "description": "向群发对象发送指定命令的消息，cmd为空时发送默认消息",
+        }, {
+            "path": "/broadcast/status",
+            "endpoint": self.api_broadcast_status,
+            "methods": ["GET"],
+            "summary": "群发进度",
+            "description": "查询当前或最近一次群发的进度",
+        }, {
+            "path": "/schedule/status",
+            "endpoint": self.api_schedule_status,
+            "methods": ["GET"],
+            "summary": "定时消息",
+            "description": "查询定时消息的下次发送时间与发送统计",
         }]
 
-    def get_api(self) -> List[Dict[str, Any]]:
-        pass
+    def api_broadcast(self, cmd: Optional[str] = None) -> Dict[str, Any]:
+        """
+        API：开始群发
+        """
+        success, msg = self.__start_broadcast(cmd)
+        return {"success": success, "message": msg}
+
+    def get_service(self) -> List[Dict[str, Any]]:
+        """
+        注册插件公共服务：定时消息每分钟检查一次
+        """
+        if not self._scheduler:
+            return []
+        from apscheduler.triggers.cron import CronTrigger
+        return [{
+            "id": "CustomCmdMsg.schedule",
+            "name": "自定义消息定时发送",
+            "trigger": CronTrigger.from_crontab("* * * * *"),
+            "func": self.__schedule_tick,
+            "kwargs": {}
+        }]
+
+    def api_schedule_status(self) -> Dict[str, Any]:
+        """
+        API：定时消息状态
+        """
+        if not self._scheduler:
+            return {"state": "disabled"}
+        return self._scheduler.status()
+
+    def api_broadcast_status(self) -> Dict[str, Any]:
+        """
+        API：群发进度
+        """
+        if not self._broadcaster:
+            return {"state": "disabled"}
+        return self._broadcaster.status()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        回复统计数据
+        """
+        stats = self._metrics.snapshot() if self._metrics else {}
+        if self._counter_lock is not None:
+            with self._counter_lock:
+                stats["suppressed"] = dict(self._suppressed)
+        stats["queue"] = self._dispatcher.stats if self._dispatcher else None
+        stats["config"] = self._config_persister.stats
+        return stats
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
         拼装插件配置页面，需要返回两块数据：1、页面配置；2、数据结构
         """
+        return self.__form_schema()
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def __form_schema() -> Tuple[List[dict], Dict[str, Any]]:
+        """
+        配置页面与默认数据均与当前配置无关，只构建一次，返回的结构为共享对象，不可修改
+        """
         return [
             {
                 'component': 'VForm',
@@ -94,14 +614,504 @@ class CustomCmdMsg(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 6
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'enabled',
+                                            'label': '启用插件',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'async_send',
+                                            'label': '异步回复',
+                                            'hint': '回复消息放入队列由后台线程发送，不阻塞事件处理',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'send_workers',
+                                            'label': '发送线程数',
+                                            'type': 'number',
+                                            'placeholder': '2',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'send_queue_size',
+                                            'label': '队列长度',
+                                            'type': 'number',
+                                            'placeholder': '100',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'send_overflow',
+                                            'label': '队列满时',
+                                            'items': [
+                                                {'title': '丢弃最早的消息', 'value': ReplyDispatcher.DROP_OLDEST},
+                                                {'title': '丢弃新消息', 'value': ReplyDispatcher.DROP_NEWEST},
+                                                {'title': '阻塞等待', 'value': ReplyDispatcher.BLOCK},
+                                            ]
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'send_block_timeout',
+                                            'label': '阻塞超时（秒）',
+                                            'type': 'number',
+                                            'placeholder': '5',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'dedupe_window',
+                                            'label': '重复过滤窗口（秒）',
+                                            'type': 'number',
+                                            'placeholder': '3',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 2
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'user_rate',
+                                            'label': '单用户速率（次/分钟）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 2
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'user_burst',
+                                            'label': '单用户突发',
+                                            'type': 'number',
+                                            'placeholder': '3',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 2
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'global_rate',
+                                            'label': '全局速率（次/分钟）',
+                                            'type': 'number',
+                                            'placeholder': '0',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 2
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'global_burst',
+                                            'label': '全局突发',
+                                            'type': 'number',
+                                            'placeholder': '10',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'media_cache',
+                                            'label': '图片缓存',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSelect',
+                                        'props': {
+                                            'model': 'media_cache_channels',
+                                            'label': '使用缓存的渠道',
+                                            'multiple': True,
+                                            'chips': True,
+                                            'items': [{'title': channel.value, 'value': channel.name}
+                                                      for channel in MessageChannel],
+                                            'hint': '仅选择支持本地图片路径的渠道',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'media_cache_size',
+                                            'label': '缓存大小（MB）',
+                                            'type': 'number',
+                                            'placeholder': '50',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'chunk_enabled',
+                                            'label': '长消息分段发送',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'chunk_limits',
+                                            'label': '自定义长度限制',
+                                            'rows': 1,
+                                            'auto-grow': True,
+                                            'placeholder': 'Telegram:4096',
+                                            'hint': '每行格式为 渠道:长度，默认企业微信2048字节、Telegram 4096字符',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'chunk_retries',
+                                            'label': '分段失败重试次数',
+                                            'type': 'number',
+                                            'placeholder': '2',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 8
                                 },
                                 'content': [
                                     {
-                                        'component': 'VSwitch',
+                                        'component': 'VTextarea',
                                         'props': {
-                                            'model': 'enabled',
-                                            'label': '启用插件',
+                                            'model': 'broadcast_targets',
+                                            'label': '群发对象',
+                                            'rows': 3,
+                                            'auto-grow': True,
+                                            'placeholder': 'Wechat:用户1,用户2\nTelegram:*',
+                                            'hint': '每行一个渠道，格式为 渠道:用户1,用户2，用户为*时发送给渠道的默认接收人',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 4
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'broadcast_admins',
+                                            'label': '群发管理员',
+                                            'placeholder': '用户1,用户2',
+                                            'hint': '允许使用/custom_broadcast命令的用户ID，多个用英文逗号分隔',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'broadcast_batch_size',
+                                            'label': '每批用户数',
+                                            'type': 'number',
+                                            'placeholder': '20',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'broadcast_rate',
+                                            'label': '每渠道速率（条/秒）',
+                                            'type': 'number',
+                                            'placeholder': '5',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'broadcast_concurrency',
+                                            'label': '每渠道并发批次',
+                                            'type': 'number',
+                                            'placeholder': '4',
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'broadcast_retries',
+                                            'label': '失败重试次数',
+                                            'type': 'number',
+                                            'placeholder': '3',
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'schedules',
+                                            'label': '定时消息',
+                                            'rows': 3,
+                                            'auto-grow': True,
+                                            'placeholder': '[{"cron": "0 9 * * 1-5", "cmd": "/custom_cmdmsg", '
+                                                           '"targets": ["Telegram:用户1,用户2"]}]',
+                                            'hint': 'JSON数组，cmd为要发送的命令，留空为默认消息；targets格式同群发对象，留空时使用群发对象',
+                                            'persistent-hint': True,
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextarea',
+                                        'props': {
+                                            'model': 'auto_replies',
+                                            'label': '关键词自动回复',
+                                            'rows': 3,
+                                            'auto-grow': True,
+                                            'placeholder': '[{"name": "帮助", "keywords": ["帮助", "help"], "regex": "^怎么.*用", '
+                                                           '"priority": 0, "title": "使用帮助", "text": "发送 /custom_cmdmsg 查看"}]',
+                                            'hint': 'JSON数组，收到非命令消息时按关键词或正则匹配回复；同时匹配多条时priority大的优先，相同时先配置的优先',
+                                            'persistent-hint': True,
                                         }
                                     }
                                 ]
@@ -128,7 +1138,7 @@ class CustomCmdMsg(_PluginBase):
                                             'label': '消息主题',
                                             'clearable': True,
                                             'placeholder': '消息主题与文本内容必须填写其中一项，否则无法回复自定义消息！',
-                                            'hint': '适配各种类字符，支持换行符',
+                                            'hint': '适配各种类字符，支持换行符；以file://开头时从本地文件读取',
                                             'persistent-hint': True,
                                             'active': True,
                                         }
@@ -157,7 +1167,7 @@ class CustomCmdMsg(_PluginBase):
                                             'label': '文本内容',
                                             "clearable": True,
                                             'placeholder': '消息主题与文本内容必须填写其中一项，否则无法回复自定义消息！',
-                                            'hint': '适配各种类字符，支持换行符',
+                                            'hint': '适配各种类字符，支持换行符；以file://开头时从本地文件读取，如file:///config/notice.txt',
                                             'persistent-hint': True,
                                             'active': True,
                                         }
@@ -224,6 +1234,32 @@ class CustomCmdMsg(_PluginBase):
                             },
                         ]
                     },
+                    {
+                        'component': 'VRow',
+                        'props': {
+                            'align': 'center'
+                        },
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 12
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VAceEditor',
+                                        'props': {
+                                            'modelvalue': 'cmd_table',
+                                            'lang': 'json',
+                                            'theme': 'monokai',
+                                            'style': 'height: 20rem; font-size: 14px',
+                                        }
+                                    }
+                                ]
+                            },
+                        ]
+                    },
                     {
                         'component': 'VRow',
                         'props': {
@@ -246,6 +1282,20 @@ class CustomCmdMsg(_PluginBase):
                                             'text': '注意：\n'
                                                     '*命令为：/custom_cmdmsg\n'
                                                     '\n'
+                                                    '*命令表为JSON数组，可配置多条命令，每条命令格式：\n'
+                                                    '{"cmd": "/faq", "desc": "常见问题", "title": "消息主题", '
+                                                    '"text": "文本内容", "image": "图片地址", "link": "链接地址"}\n'
+                                                    '修改命令表后需重启MoviePilot使新命令生效\n'
+                                                    '\n'
+                                                    '*消息主题与文本内容支持占位符：{user} 用户、{channel} 渠道、{source} 来源、'
+                                                    '{cmd} 命令、{date} 日期、{time} 时间、{count} 本命令调用次数、{total} 全部命令调用次数\n'
+                                                    '\n'
+                                                    '*同一用户在重复过滤窗口内的相同命令只回复一次；速率为0时不限流\n'
+                                                    '\n'
+                                                    '*群发命令为：/custom_broadcast [命令]，不带命令时群发默认消息，仅群发管理员可用\n'
+                                                    '\n'
+                                                    '*定时消息按cron表达式发送，同一分钟内多个定时消息发给同一用户时只发送一次\n'
+                                                    '\n'
                                                     '*需配合『命令管理』插件实现添加微信按钮\n'
                                                     '作者仓库：https://github.com/InfinityPacer/MoviePilot-Plugins/\n'
                                                     '\n'
@@ -265,16 +1315,166 @@ class CustomCmdMsg(_PluginBase):
             "msg_text": "",
             "msg_image": "",
             "msg_link": "",
+            "cmd_table": "[]",
+            "async_send": False,
+            "send_workers": 2,
+            "send_queue_size": 100,
+            "send_overflow": ReplyDispatcher.DROP_OLDEST,
+            "send_block_timeout": 5,
+            "media_cache": False,
+            "media_cache_channels": [],
+            "media_cache_size": 50,
+            "dedupe_window": 3,
+            "user_rate": 0,
+            "user_burst": 3,
+            "global_rate": 0,
+            "global_burst": 10,
+            "broadcast_targets": "",
+            "broadcast_admins": "",
+            "broadcast_batch_size": 20,
+            "broadcast_rate": 5,
+            "broadcast_concurrency": 4,
+            "broadcast_retries": 3,
+            "chunk_enabled": False,
+            "chunk_limits": "",
+            "chunk_retries": 2,
+            "schedules": "",
+            "auto_replies": "",
         }
 
     def get_page(self) -> List[dict]:
-        pass
+        """
+        拼装插件详情页面，展示回复统计
+        """
+        stats = self.get_stats()
+        total = stats.get("total") or {}
+
+        def _ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value:g} ms"
+
+        def _card(title: str, value: Any) -> dict:
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 6,
+                    'md': 2
+                },
+                'content': [
+                    {
+                        'component': 'VCard',
+                        'props': {
+                            'variant': 'tonal'
+                        },
+                        'content': [
+                            {
+                                'component': 'VCardText',
+                                'content': [
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-caption'
+                                        },
+                                        'text': title
+                                    },
+                                    {
+                                        'component': 'div',
+                                        'props': {
+                                            'class': 'text-h6'
+                                        },
+                                        'text': str(value)
+                                    }
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+
+        def _table(title: str, rows: Dict[str, Dict[str, Any]]) -> dict:
+            headers = [title, '次数', '错误', 'P50', 'P95', 'P99', '最大']
+            return {
+                'component': 'VCol',
+                'props': {
+                    'cols': 12
+                },
+                'content': [
+                    {
+                        'component': 'VTable',
+                        'props': {
+                            'hover': True
+                        },
+                        'content': [
+                            {
+                                'component': 'thead',
+                                'content': [
+                                    {
+                                        'component': 'th',
+                                        'props': {
+                                            'class': 'text-start ps-4'
+                                        },
+                                        'text': header
+                                    } for header in headers
+                                ]
+                            },
+                            {
+                                'component': 'tbody',
+                                'content': [
+                                    {
+                                        'component': 'tr',
+                                        'content': [
+                                            {
+                                                'component': 'td',
+                                                'props': {
+                                                    'class': 'ps-4'
+                                                },
+                                                'text': str(text)
+                                            } for text in (name, row["count"], row["errors"],
+                                                           _ms(row["p50_ms"]), _ms(row["p95_ms"]),
+                                                           _ms(row["p99_ms"]), _ms(row["max_ms"]))
+                                        ]
+                                    } for name, row in sorted(rows.items(), key=lambda x: -x[1]["count"])
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+
+        return [
+            {
+                'component': 'VRow',
+                'content': [
+                    _card('回复次数', total.get("count", 0)),
+                    _card('错误次数', total.get("errors", 0)),
+                    _card('被过滤', sum(stats.get("suppressed", {}).values())),
+                    _card('P50', _ms(total.get("p50_ms"))),
+                    _card('P95', _ms(total.get("p95_ms"))),
+                    _card('P99', _ms(total.get("p99_ms"))),
+                ]
+            },
+            {
+                'component': 'VRow',
+                'content': [
+                    _table('命令', stats.get("commands", {})),
+                    _table('渠道', stats.get("channels", {})),
+                ]
+            }
+        ]
 
     def stop_service(self):
         """
         退出插件
         """
-        pass
+        if self._scheduler:
+            self._scheduler.stop()
+            self._scheduler = None
+        if self._broadcaster:
+            self._broadcaster.stop()
+            self._broadcaster = None
+        if self._dispatcher:
+            # 发送完队列中剩余的消息
+            self._dispatcher.shutdown(drain=True, timeout=10)
+            self._dispatcher = None
 
     @eventmanager.register(EventType.PluginAction)
     def custom_cmd_msg(self, event: Event = None):
@@ -282,23 +1482,239 @@ class CustomCmdMsg(_PluginBase):
         收到命令，发送自定义回复消息
         """
         if event:
+            received = time.perf_counter()
             event_data = event.event_data
-            if not event_data or event_data.get("action") != "custom_cmdmsg":
+            if not event_data:
+                return
+            if event_data.get("action") == BROADCAST_ACTION:
+                self.__broadcast_cmd(event_data)
+                return
+            reply = self._cmd_index.get(event_data.get("action"))
+            if not reply:
                 return
 
             logger.debug(event_data)
+            self.__reply(reply, received=received,
+                         userid=event_data.get("user"),
+                         channel=event_data.get("channel"),
+                         source=event_data.get("source"))
 
-            userid = event_data.get("user")
-            channel = event_data.get("channel")
-            channel_str = channel.value
-            source = event_data.get("source")
+    @eventmanager.register(EventType.UserMessage)
+    def auto_reply(self, event: Event = None):
+        """
+        收到用户消息，匹配自动回复规则后回复
+        """
+        if not event or not self._matcher:
+            return
+        received = time.perf_counter()
+        event_data = event.event_data or {}
+        text = event_data.get("text")
+        # 命令由命令处理
+        if not text or text.startswith("/"):
+            return
+        reply = self._matcher.match(text)
+        if not reply:
+            return
+        self.__reply(reply, received=received,
+                     userid=event_data.get("userid") or event_data.get("user"),
+                     channel=event_data.get("channel"),
+                     source=event_data.get("source"))
+
+    def __reply(self, reply: CmdReply, received: float, userid: Any, channel: MessageChannel, source: Any):
+        """
+        过滤、生成并发送回复消息
+        """
+        channel_str = channel.value if channel else None
+        logger.info(f"收到来自'用户:{userid},渠道:{channel_str},来源:{source}'的{reply.cmd}，回复消息...")
+
+        reason = self.__suppress_reason(userid=userid, channel=channel_str, action=reply.action)
+        if reason:
+            with self._counter_lock:
+                self._suppressed[reason] += 1
+                suppressed = self._suppressed[reason]
+            logger.debug(f"命令{reply.cmd}已被过滤：{reason}，累计{suppressed}次")
+            return
+
+        variables = self.__template_vars(reply, user=userid, channel=channel_str, source=source)
+        message = {
+            "channel": channel,
+            "title": reply.title_tpl.render(variables),
+            "text": reply.text_tpl.render(variables),
+            "image": reply.image,
+            "link": reply.link,
+            "userid": userid,
+            "source": source,
+        }
+        if self._dispatcher:
+            self._dispatcher.submit((reply.cmd, received, message))
+        else:
+            self.__send_reply((reply.cmd, received, message))
 
-            logger.info(f"收到来自'用户:{userid},渠道:{channel_str},来源:{source}'的命令，回复消息...")
+    def __broadcast_cmd(self, event_data: Dict[str, Any]):
+        """
+        收到群发命令，参数为要群发的命令，留空时群发默认消息
+        """
+        userid = event_data.get("user")
+        channel = event_data.get("channel")
+        source = event_data.get("source")
+        admins = {x.strip() for x in (self._broadcast_admins or "").split(",") if x.strip()}
+        if str(userid) not in admins:
+            logger.warning(f"用户{userid}无群发权限")
+            self.post_message(channel=channel, title="无群发权限", userid=userid, source=source)
+            return
 
+        def _notify(status: Dict[str, Any]):
             self.post_message(channel=channel,
-                                title=self._msg_title,
-                                text=self._msg_text,
-                                image=self._msg_image,
-                                link=self._msg_link,
-                                userid=userid,
-                                source=source)
\ No newline at end of file
+                              title="群发结束",
+                              text=f"共{status['total']}条，成功{status['sent']}条，失败{status['failed']}条，"
+                                   f"耗时{status['elapsed']}秒",
+                              userid=userid,
+                              source=source)
+
+        success, msg = self.__start_broadcast(event_data.get("arg_str"), on_done=_notify)
+        self.post_message(channel=channel, title=msg, userid=userid, source=source)
+
+    def __start_broadcast(self, cmd: Optional[str] = None, on_done=None) -> Tuple[bool, str]:
+        """
+        开始群发
+        :param cmd: 要群发的命令，留空时群发默认消息
+        """
+        if not self._broadcaster:
+            return False, "未启用插件或未配置群发对象"
+        action = self.__cmd_action(cmd)
+        reply = self._cmd_index.get(action)
+        if not reply:
+            return False, f"命令{cmd}不存在"
+        targets = self.__parse_broadcast_targets(self._broadcast_targets)
+        if not targets:
+            return False, "群发对象为空"
+        if not self._broadcaster.start(targets,
+                                       send=lambda channel, userid: self.__send_broadcast(reply, channel, userid),
+                                       name=reply.cmd,
+                                       on_done=on_done):
+            return False, "已有群发任务正在进行"
+        total = sum(len(users) for users in targets.values())
+        logger.info(f"开始群发{reply.cmd}，共{total}条")
+        return True, f"开始群发{reply.cmd}，共{total}条"
+
+    @staticmethod
+    def __cmd_action(cmd: Optional[str]) -> str:
+        """
+        命令对应的动作，命令为空时为默认消息
+        """
+        cmd = (cmd or "").strip()
+        if cmd and not cmd.startswith("/"):
+            cmd = f"/{cmd}"
+        return f"{DEFAULT_ACTION}_{cmd.lstrip('/')}" if cmd and cmd != "/custom_cmdmsg" else DEFAULT_ACTION
+
+    def __send_scheduled(self, action: str, channel: MessageChannel, userid: Optional[str]):
+        """
+        发送定时消息
+        """
+        reply = self._cmd_index.get(action)
+        if reply:
+            self.__send_broadcast(reply, channel, userid)
+
+    def __schedule_tick(self):
+        """
+        定时服务，每分钟检查一次到期的定时消息
+        """
+        if self._scheduler:
+            self._scheduler.tick()
+
+    def __send_broadcast(self, reply: CmdReply, channel: MessageChannel, userid: Optional[str]):
+        """
+        发送单条群发消息
+        """
+        variables = self.__template_vars(reply, user=userid, channel=channel.value, source=None)
+        message = {
+            "channel": channel,
+            "title": reply.title_tpl.render(variables),
+            "text": reply.text_tpl.render(variables),
+            "image": reply.image,
+            "link": reply.link,
+            "userid": userid,
+        }
+        if self._media and reply.image and channel.name in self._media_cache_channels:
+            message["image"] = self._media.resolve(reply.image) or reply.image
+        self.__post(message)
+
+    def __post(self, message: Dict[str, Any]):
+        """
+        发送消息，超过渠道长度限制时按顺序分段发送，失败时只重试失败的分段
+        """
+        channel = message.get("channel")
+        if not self._chunker or not channel:
+            self.post_message(**message)
+            return
+        chunks = self._chunker.split(channel.name, message.get("text"), title=message.get("title"))
+        if len(chunks) == 1:
+            self.post_message(**message)
+            return
+        for i, chunk in enumerate(chunks):
+            # 消息主题、图片与链接只随第一段发送
+            part = dict(message, text=chunk) if i == 0 \
+                else dict(message, title=None, text=chunk, image=None, link=None)
+            for attempt in range(self._chunk_retries + 1):
+                try:
+                    self.post_message(**part)
+                    break
+                except Exception as e:
+                    if attempt == self._chunk_retries:
+                        raise
+                    logger.warning(f"第{i + 1}/{len(chunks)}段消息发送失败，准备重试：{e}")
+                    time.sleep(0.5 * 2 ** attempt)
+
+    def __suppress_reason(self, userid: Any, channel: str, action: str) -> Optional[str]:
+        """
+        判断是否需要过滤本次命令，返回过滤原因
+        """
+        if self._dedupe is not None and self._dedupe.is_duplicate((userid, channel, action)):
+            return "重复事件"
+        if self._user_limiter is not None and not self._user_limiter.allow((userid, channel)):
+            return "用户限流"
+        if self._global_limiter is not None and not self._global_limiter.allow(None):
+            return "全局限流"
+        return None
+
+    def __template_vars(self, reply: CmdReply, **kwargs) -> Dict[str, Any]:
+        """
+        生成消息模板变量，静态模板不生成；所有回复均计入调用次数
+        """
+        with self._counter_lock:
+            self._counters[reply.action] += 1
+            self._counter_total += 1
+            count, total = self._counters[reply.action], self._counter_total
+        if reply.title_tpl.static and reply.text_tpl.static:
+            return {}
+        now = datetime.now()
+        return dict(kwargs,
+                    cmd=reply.cmd,
+                    date=now.strftime("%Y-%m-%d"),
+                    time=now.strftime("%H:%M:%S"),
+                    count=count,
+                    total=total)
+
+    def __send_reply(self, item: Tuple[str, float, Dict[str, Any]]):
+        """
+        发送回复消息
+        :param item: 命令、收到命令的时间、消息内容
+        """
+        cmd, received, message = item
+        channel = message.get("channel")
+        if self._media and message.get("image") and channel \
+                and channel.name in self._media_cache_channels:
+            # 使用本地缓存的图片，获取失败时仍使用原地址
+            message = dict(message, image=self._media.resolve(message["image"]) or message["image"])
+        error = False
+        try:
+            self.__post(message)
+        except Exception:
+            error = True
+            raise
+        finally:
+            if self._metrics:
+                self._metrics.record(command=cmd,
+                                     channel=channel.value if channel else "",
+                                     latency_ms=(time.perf_counter() - received) * 1000,
+                                     error=error)
\ No newline at end of file
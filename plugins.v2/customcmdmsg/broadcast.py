@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from app.log import logger
+
+from .ratelimit import TokenBucket
+
+
+class Broadcaster:
+    """
+    群发消息：按渠道分批并发发送，每个渠道独立限速，失败按指数退避重试
+    """
+
+    def __init__(self, batch_size: int = 20, rate: float = 5.0, concurrency: int = 4,
+                 retries: int = 3, backoff: float = 1.0):
+        """
+        :param batch_size: 每批用户数量
+        :param rate: 每个渠道每秒最多发送的消息数
+        :param concurrency: 每个渠道同时发送的批次数
+        :param retries: 失败重试次数
+        :param backoff: 首次重试等待时间（秒），之后每次翻倍
+        """
+        self._send: Optional[Callable[[Any, Optional[str]], None]] = None
+        self._batch_size = max(1, batch_size)
+        self._rate = max(0.1, rate)
+        self._concurrency = max(1, concurrency)
+        self._retries = max(0, retries)
+        self._backoff = max(0.0, backoff)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, targets: Dict[Any, List[Optional[str]]], send: Callable[[Any, Optional[str]], None],
+              name: str = "", on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> bool:
+        """
+        开始群发，已有群发任务进行中时返回False
+        :param targets: 渠道 -> 用户ID列表，用户ID为None时发送给渠道的默认接收人
+        :param send: 发送函数，参数为渠道与用户ID
+        :param name: 群发任务名称
+        :param on_done: 群发结束后的回调，参数为群发状态
+        """
+        with self._lock:
+            if self.running:
+                return False
+            total = sum(len(users) for users in targets.values())
+            self._stop_event.clear()
+            self._send = send
+            self._status = {
+                "state": "running",
+                "name": name,
+                "total": total,
+                "sent": 0,
+                "failed": 0,
+                "retried": 0,
+                "started": time.time(),
+                "elapsed": 0.0,
+                "channels": {self.__channel_name(c): {"total": len(u), "sent": 0, "failed": 0}
+                             for c, u in targets.items()},
+            }
+            self._thread = threading.Thread(target=self.__run, args=(targets, on_done),
+                                            name="CustomCmdMsg-broadcast", daemon=True)
+            self._thread.start()
+            return True
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = dict(self._status)
+            if status.get("state") == "running":
+                status["elapsed"] = round(time.time() - status["started"], 1)
+            status["channels"] = {k: dict(v) for k, v in status.get("channels", {}).items()}
+            return status
+
+    def stop(self, timeout: float = 10.0):
+        """
+        停止群发，未发送的消息将被取消
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def __run(self, targets: Dict[Any, List[Optional[str]]], on_done: Optional[Callable]):
+        buckets = {channel: TokenBucket(rate=self._rate, burst=self._rate) for channel in targets}
+        bucket_locks = {channel: threading.Lock() for channel in targets}
+        # 每个渠道同时发送的批次数
+        slots = {channel: threading.Semaphore(self._concurrency) for channel in targets}
+
+        def _acquire(channel: Any):
+            while not self._stop_event.is_set():
+                with bucket_locks[channel]:
+                    bucket = buckets[channel]
+                    if bucket.consume():
+                        return True
+                    delay = (1 - bucket.tokens) / bucket.rate
+                self._stop_event.wait(delay)
+            return False
+
+        def _send_batch(channel: Any, users: List[Optional[str]]):
+            with slots[channel]:
+                for userid in users:
+                    if not _acquire(channel):
+                        return
+                    self.__send_one(channel, userid)
+
+        workers = max(1, len(targets) * self._concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="CustomCmdMsg-broadcast") as executor:
+            futures = [executor.submit(_send_batch, channel, users[i:i + self._batch_size])
+                       for channel, users in targets.items()
+                       for i in range(0, len(users), self._batch_size)]
+            wait(futures)
+
+        with self._lock:
+            self._status["state"] = "cancelled" if self._stop_event.is_set() else "finished"
+            self._status["elapsed"] = round(time.time() - self._status["started"], 1)
+            status = dict(self._status)
+        logger.info(f"群发{status.get('name')}结束：共{status['total']}条，成功{status['sent']}条，"
+                    f"失败{status['failed']}条，耗时{status['elapsed']}秒")
+        if on_done:
+            try:
+                on_done(status)
+            except Exception as e:
+                logger.error(f"群发结束回调失败：{e}")
+
+    def __send_one(self, channel: Any, userid: Optional[str]):
+        channel_name = self.__channel_name(channel)
+        for attempt in range(self._retries + 1):
+            try:
+                self._send(channel, userid)
+                ok = True
+            except Exception as e:
+                ok = False
+                logger.warning(f"群发消息失败：渠道{channel_name}，用户{userid}，第{attempt + 1}次：{e}")
+            if ok or attempt == self._retries or self._stop_event.is_set():
+                break
+            with self._lock:
+                self._status["retried"] += 1
+            # 指数退避，附加随机抖动
+            self._stop_event.wait(self._backoff * (2 ** attempt) * (1 + random.random() / 2))
+        with self._lock:
+            key = "sent" if ok else "failed"
+            self._status[key] += 1
+            self._status["channels"][channel_name][key] += 1
+            done = self._status["sent"] + self._status["failed"]
+            total = self._status["total"]
+        if done == total or done % max(1, total // 10) == 0:
+            logger.info(f"群发进度：{done}/{total}")
+
+    @staticmethod
+    def __channel_name(channel: Any) -> str:
+        return getattr(channel, "value", str(channel))
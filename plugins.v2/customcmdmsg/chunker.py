@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# 各渠道单条消息的最大长度：(长度, 是否按UTF-8字节计算)
+CHANNEL_LIMITS: Dict[str, Tuple[int, bool]] = {
+    "Wechat": (2048, True),
+    "Telegram": (4096, False),
+    "Slack": (3000, False),
+    "Discord": (2000, False),
+    "SynologyChat": (2000, False),
+    "VoceChat": (4000, False),
+}
+
+
+def _size(text: str, by_bytes: bool) -> int:
+    return len(text.encode("utf-8")) if by_bytes else len(text)
+
+
+def _cut(text: str, size: int, by_bytes: bool) -> int:
+    """
+    不超过长度限制的最长前缀的字符数，至少为1
+    """
+    if by_bytes:
+        size = len(text.encode("utf-8")[:size].decode("utf-8", errors="ignore"))
+    return max(1, size)
+
+
+class TextChunker:
+    """
+    长消息分段：优先按段落、其次按行切分，超长的行按长度硬切，
+    分段结果按文本与长度限制做LRU缓存
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, bool]]] = None, cache_size: int = 256):
+        self.limits = dict(CHANNEL_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self._cache: "OrderedDict[Tuple, List[str]]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_limits(value: Optional[str]) -> Dict[str, Tuple[int, bool]]:
+        """
+        解析自定义长度限制，每行格式为 渠道:长度，计算方式沿用渠道默认值
+        """
+        limits = {}
+        for line in (value or "").splitlines():
+            name, _, size = line.partition(":")
+            name, size = name.strip(), size.strip()
+            if not name or not size.isdigit():
+                continue
+            limits[name] = (int(size), CHANNEL_LIMITS.get(name, (0, False))[1])
+        return limits
+
+    def split(self, channel: str, text: Optional[str], title: Optional[str] = None) -> List[Optional[str]]:
+        """
+        按渠道长度限制切分文本
+        :param channel: 渠道名称
+        :param text: 文本内容
+        :param title: 消息主题，第一段需要为其预留长度
+        """
+        limit = self.limits.get(channel)
+        if not text or not limit or limit[0] <= 0:
+            return [text]
+        size, by_bytes = limit
+        reserve = _size(title, by_bytes) + 1 if title else 0
+        if _size(text, by_bytes) + reserve <= size:
+            return [text]
+        key = (text, size, by_bytes, reserve)
+        with self._lock:
+            chunks = self._cache.get(key)
+            if chunks is not None:
+                self._cache.move_to_end(key)
+                return chunks
+        chunks = self.__split(text, size, by_bytes, reserve)
+        with self._lock:
+            self._cache[key] = chunks
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return chunks
+
+    @staticmethod
+    def __split(text: str, size: int, by_bytes: bool, reserve: int) -> List[str]:
+        # 拆分为不超过长度限制的片段：(与前一片段的分隔符, 片段)，依次尝试段落、行、按长度硬切
+        units: List[Tuple[str, str]] = []
+        for i, paragraph in enumerate(text.split("\n\n")):
+            paragraph_sep = "\n\n" if i else ""
+            if _size(paragraph, by_bytes) <= size:
+                units.append((paragraph_sep, paragraph))
+                continue
+            for j, line in enumerate(paragraph.split("\n")):
+                sep = "\n" if j else paragraph_sep
+                while _size(line, by_bytes) > size:
+                    cut = _cut(line, size, by_bytes)
+                    units.append((sep, line[:cut]))
+                    line, sep = line[cut:], ""
+                units.append((sep, line))
+        # 依次合并片段，尽量填满每一段
+        chunks: List[str] = []
+        current = ""
+        first_limit = max(1, size - reserve)
+        for sep, piece in units:
+            limit = first_limit if not chunks else size
+            candidate = current + sep + piece if current else piece
+            if current and _size(candidate, by_bytes) > limit:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+            # 第一段需为主题预留长度，单个片段超出时按长度硬切，剩余部分并入下一段
+            while not chunks and _size(current, by_bytes) > first_limit:
+                cut = _cut(current, first_limit, by_bytes)
+                chunks.append(current[:cut])
+                current = current[cut:]
+        if current:
+            chunks.append(current)
+        return chunks
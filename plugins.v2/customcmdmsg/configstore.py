@@ -0,0 +1,55 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from app.log import logger
+
+
+def config_hash(config: Optional[Dict[str, Any]]) -> str:
+    """
+    计算配置哈希，与键顺序无关
+    """
+    raw = json.dumps(config or {}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ConfigPersister:
+    """
+    插件配置保存：与已保存的配置比较哈希，未变化时跳过写入，并统计写入与跳过次数。
+    插件配置只能整体写入，有变化时仍写入完整配置
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.skipped = 0
+
+    def persist(self, plugin: Any, config: Dict[str, Any]) -> bool:
+        """
+        保存插件配置
+        :param plugin: 插件实例，使用其get_config与update_config读写配置
+        :param config: 完整配置
+        :return: 是否写入了配置
+        """
+        digest = config_hash(config)
+        with self._lock:
+            # 配置可能被配置页面直接保存，以已保存的配置为准
+            stored = plugin.get_config()
+            if stored is not None and config_hash(stored) == digest:
+                self.skipped += 1
+                logger.debug(f"{plugin.__class__.__name__} 配置未变化，跳过保存（已跳过{self.skipped}次）")
+                return False
+            changed = [key for key, value in config.items() if (stored or {}).get(key) != value]
+            plugin.update_config(config)
+            self.writes += 1
+            logger.debug(f"{plugin.__class__.__name__} 配置已保存，变化项：{', '.join(changed) or '无'}")
+            return True
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        配置写入统计
+        """
+        with self._lock:
+            return {"writes": self.writes, "skipped": self.skipped}
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List
+
+from app.log import logger
+
+
+class ReplyDispatcher:
+    """
+    有界队列 + 小型线程池的异步消息投递器
+    """
+    # 队列满时丢弃最早的消息
+    DROP_OLDEST = "drop_oldest"
+    # 队列满时丢弃新消息
+    DROP_NEWEST = "drop_newest"
+    # 队列满时阻塞等待，超时后丢弃新消息
+    BLOCK = "block"
+
+    OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+    def __init__(self, handler: Callable[[Any], None], workers: int = 2, maxsize: int = 100,
+                 overflow: str = DROP_OLDEST, block_timeout: float = 5.0, name: str = "ReplyDispatcher"):
+        self._handler = handler
+        self._maxsize = max(1, maxsize)
+        self._overflow = overflow if overflow in self.OVERFLOW_POLICIES else self.DROP_OLDEST
+        self._block_timeout = max(0.0, block_timeout)
+        self._queue: Deque[Any] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats: Dict[str, int] = {"submitted": 0, "sent": 0, "failed": 0, "dropped": 0, "cancelled": 0}
+        self._workers: List[threading.Thread] = []
+        for i in range(max(1, workers)):
+            worker = threading.Thread(target=self.__run, name=f"{name}-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, item: Any) -> bool:
+        """
+        投递消息到队列，返回是否入队成功
+        """
+        with self._cond:
+            if self._closed:
+                self._stats["dropped"] += 1
+                return False
+            if len(self._queue) >= self._maxsize:
+                if self._overflow == self.DROP_NEWEST:
+                    self._stats["dropped"] += 1
+                    logger.warning("回复队列已满，丢弃新消息")
+                    return False
+                if self._overflow == self.DROP_OLDEST:
+                    self._queue.popleft()
+                    self._stats["dropped"] += 1
+                    logger.warning("回复队列已满，丢弃最早的消息")
+                else:
+                    deadline = time.monotonic() + self._block_timeout
+                    while len(self._queue) >= self._maxsize and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if len(self._queue) >= self._maxsize or self._closed:
+                        self._stats["dropped"] += 1
+                        logger.warning("回复队列已满，等待超时，丢弃新消息")
+                        return False
+            self._queue.append(item)
+            self._stats["submitted"] += 1
+            self._cond.notify_all()
+            return True
+
+    def shutdown(self, drain: bool = True, timeout: float = 10.0):
+        """
+        停止投递
+        :param drain: 是否先发送完队列中剩余的消息，否则直接取消
+        :param timeout: 等待工作线程退出的最长时间（秒）
+        """
+        with self._cond:
+            self._closed = True
+            if not drain:
+                self._stats["cancelled"] += len(self._queue)
+                self._queue.clear()
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            if self._queue:
+                # 超时仍未发送完的消息
+                self._stats["cancelled"] += len(self._queue)
+                logger.warning(f"回复队列停止超时，取消 {len(self._queue)} 条未发送的消息")
+                self._queue.clear()
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._stats, pending=len(self._queue))
+
+    def __run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                item = self._queue.popleft()
+                # 唤醒阻塞等待入队的线程
+                self._cond.notify_all()
+            try:
+                self._handler(item)
+                ok = True
+            except Exception as e:
+                ok = False
+                logger.error(f"回复消息发送失败：{e}")
+            with self._cond:
+                self._stats["sent" if ok else "failed"] += 1
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.log import logger
+
+# 从本地文件读取内容的前缀
+FILE_PREFIX = "file://"
+
+
+class FileSource:
+    """
+    本地文件内容缓存：内容常驻内存，仅在文件修改时间或大小变化时重新读取，
+    两次检查之间间隔不少于 check_interval 秒
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = Path(path)
+        self._check_interval = max(0.0, check_interval)
+        self._lock = threading.Lock()
+        self._content: Optional[str] = None
+        # (修改时间, 大小)
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked: float = 0.0
+        # 内容版本，每次重新读取后递增
+        self.version = 0
+
+    @staticmethod
+    def is_file_source(value: Optional[str]) -> bool:
+        return bool(value) and value.startswith(FILE_PREFIX)
+
+    @classmethod
+    def from_value(cls, value: str, check_interval: float = 1.0) -> "FileSource":
+        return cls(value[len(FILE_PREFIX):].strip(), check_interval=check_interval)
+
+    def read(self) -> Optional[str]:
+        """
+        获取文件内容，文件不存在或读取失败时返回上一次的内容
+        """
+        now = time.monotonic()
+        if self._stat is not None and now - self._checked < self._check_interval:
+            return self._content
+        with self._lock:
+            if self._stat is not None and now - self._checked < self._check_interval:
+                return self._content
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except OSError as e:
+                if self._stat != (-1, -1):
+                    logger.warning(f"读取消息文件失败：{self.path} - {e}")
+                    self._stat = (-1, -1)
+                return self._content
+            key = (stat.st_mtime_ns, stat.st_size)
+            if key != self._stat:
+                try:
+                    self._content = self.path.read_text(encoding="utf-8")
+                    self._stat = key
+                    self.version += 1
+                    logger.info(f"已重新读取消息文件：{self.path}")
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"读取消息文件失败：{self.path} - {e}")
+            return self._content
@@ -0,0 +1,247 @@
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.log import logger
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# 反向引用，合并后分组序号会变化
+_BACKREF = re.compile(r"\\\d|\(\?P=")
+# 前置关键词过短时过滤效果差
+_MIN_LITERAL = 2
+# 合并正则中标记规则序号的分组名前缀，与用户分组名冲突时合并失败，退回逐条匹配
+_GROUP_PREFIX = "_MP_rule_"
+
+
+@dataclass(frozen=True)
+class MatchRule:
+    """
+    自动回复规则
+    """
+    # 关键词或正则表达式
+    pattern: str
+    # 匹配成功时返回的内容
+    value: Any
+    # 是否为正则表达式
+    regex: bool = False
+    # 优先级，数值越大越优先，相同时先配置的优先
+    priority: int = 0
+    # 是否忽略大小写
+    ignore_case: bool = True
+
+
+def required_literal(compiled: re.Pattern) -> Optional[str]:
+    """
+    提取正则表达式匹配时必须出现的最长连续字面量，用于预先过滤；
+    忽略大小写时只使用大小写折叠结果一致的字符，无法提取时返回None
+    """
+    try:
+        parsed = sre_parse.parse(compiled.pattern, compiled.flags)
+    except Exception:
+        return None
+    ignore_case = bool(compiled.flags & re.IGNORECASE)
+    best, current = "", []
+    # 只取顶层的字面量序列，分支、分组与量词内的内容不一定出现
+    for op, av in list(parsed) + [(None, None)]:
+        char = chr(av) if op is sre_parse.LITERAL else None
+        if char is not None and (not ignore_case or char.casefold() == char.lower()):
+            current.append(char)
+            continue
+        if len(current) > len(best):
+            best = "".join(current)
+        current = []
+    if len(best) < _MIN_LITERAL:
+        return None
+    return best.casefold() if ignore_case else best
+
+
+class _Automaton:
+    """
+    Aho-Corasick 多关键词自动机，每个状态预先记录能匹配到的最优关键词规则序号，
+    以及以该状态结尾的正则前置关键词对应的规则序号
+    """
+
+    def __init__(self, patterns: List[Tuple[str, int]], triggers: List[Tuple[str, int]] = ()):
+        """
+        :param patterns: (关键词, 规则序号)，序号越小越优先
+        :param triggers: (正则前置关键词, 规则序号)，出现时需进一步执行该正则
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._best: List[Optional[int]] = [None]
+        self._triggers: List[Tuple[int, ...]] = [()]
+        for items, is_trigger in ((patterns, False), (triggers, True)):
+            for pattern, rank in items:
+                state = self.__insert(pattern)
+                if is_trigger:
+                    self._triggers[state] += (rank,)
+                elif self._best[state] is None or rank < self._best[state]:
+                    self._best[state] = rank
+
+        # 按广度优先构建失败指针，并合并失败链上的最优规则
+        self._fail: List[int] = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fail_best = self._best[self._fail[state]]
+            if fail_best is not None and (self._best[state] is None or fail_best < self._best[state]):
+                self._best[state] = fail_best
+            self._triggers[state] += self._triggers[self._fail[state]]
+            for char, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                queue.append(nxt)
+
+    def __insert(self, pattern: str) -> int:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._best.append(None)
+                self._triggers.append(())
+            state = nxt
+        return state
+
+    def search(self, text: str, triggered: Set[int]) -> Optional[int]:
+        """
+        返回文本中出现的关键词对应的最优规则序号，出现的正则前置关键词对应的规则序号加入triggered
+        """
+        goto, fail, best_at, triggers_at = self._goto, self._fail, self._best, self._triggers
+        state, best = 0, None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if triggers_at[state]:
+                triggered.update(triggers_at[state])
+            rank = best_at[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == 0:
+                    break
+        return best
+
+
+class ReplyMatcher:
+    """
+    自动回复匹配：所有关键词编译为多关键词自动机，每条消息只需扫描一次；
+    能提取出必需字面量的正则表达式以该字面量作为前置关键词加入自动机，只在字面量出现时才执行；
+    其余正则表达式合并为一个按优先级排列的正则，只执行一次
+    """
+
+    def __init__(self, rules: List[MatchRule]):
+        # 按优先级排序，序号即为优先顺序
+        order = sorted(range(len(rules)), key=lambda i: (-rules[i].priority, i))
+        self._rules = [rules[i] for i in order]
+
+        # 规则序号 -> 已编译的正则
+        self._compiled: Dict[int, re.Pattern] = {}
+        # 需要前置关键词触发的正则 (大小写敏感, 忽略大小写)
+        triggers: Tuple[List[Tuple[str, int]], List[Tuple[str, int]]] = ([], [])
+        # 无法提取前置关键词的正则
+        self._regex_ranks: List[int] = []
+        self._regex: Optional[re.Pattern] = None
+        self._regex_list: List[Tuple[re.Pattern, int]] = []
+        self.__compile_regex(triggers)
+
+        sensitive = [(rule.pattern, rank) for rank, rule in enumerate(self._rules)
+                     if not rule.regex and not rule.ignore_case and rule.pattern]
+        insensitive = [(rule.pattern.casefold(), rank) for rank, rule in enumerate(self._rules)
+                       if not rule.regex and rule.ignore_case and rule.pattern]
+        self._sensitive = _Automaton(sensitive, triggers[0]) if sensitive or triggers[0] else None
+        self._insensitive = _Automaton(insensitive, triggers[1]) if insensitive or triggers[1] else None
+
+    def __compile_regex(self, triggers: Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]):
+        """
+        编译正则表达式：能提取必需字面量的加入triggers，其余的放在前瞻断言中按优先级合并，
+        第一个成功的分支即为最优规则；含有反向引用等无法合并的正则单独匹配
+        """
+        branches = []
+        for rank, rule in enumerate(self._rules):
+            if not rule.regex:
+                continue
+            flags = re.IGNORECASE if rule.ignore_case else 0
+            try:
+                compiled = re.compile(rule.pattern, flags)
+            except re.error as e:
+                logger.error(f"自动回复正则表达式 {rule.pattern} 无效：{e}")
+                continue
+            self._compiled[rank] = compiled
+            literal = required_literal(compiled)
+            if literal:
+                triggers[1 if compiled.flags & re.IGNORECASE else 0].append((literal, rank))
+                continue
+            self._regex_ranks.append(rank)
+            inline = "(?i:" if rule.ignore_case else "(?:"
+            branch = f"(?=[\\s\\S]*?(?P<{_GROUP_PREFIX}{rank}>{inline}{rule.pattern})))"
+            if _BACKREF.search(rule.pattern):
+                self._regex_list.append((compiled, rank))
+                continue
+            try:
+                re.compile(branch)
+            except re.error:
+                self._regex_list.append((compiled, rank))
+                continue
+            branches.append((branch, compiled, rank))
+        if not branches:
+            return
+        try:
+            self._regex = re.compile("^(?:" + "|".join(branch for branch, _, _ in branches) + ")")
+        except re.error as e:
+            # 不同规则使用了相同的分组名等情况无法合并，全部改为单独匹配
+            logger.warning(f"自动回复正则表达式无法合并，改为逐条匹配：{e}")
+            self._regex_list.extend((compiled, rank) for _, compiled, rank in branches)
+            self._regex_list.sort(key=lambda item: item[1])
+
+    def __len__(self):
+        return len(self._rules)
+
+    def match(self, text: Optional[str]) -> Optional[Any]:
+        """
+        返回最优的匹配规则内容，没有匹配时返回None
+        """
+        if not text:
+            return None
+        best, triggered = None, set()
+        for automaton, subject in ((self._sensitive, text), (self._insensitive, text.casefold())):
+            if automaton is None:
+                continue
+            rank = automaton.search(subject, triggered)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        # 只执行前置关键词已出现且优于当前结果的正则
+        for rank in sorted(triggered):
+            if best is not None and rank > best:
+                break
+            if self._compiled[rank].search(text):
+                best = rank
+                break
+        # 关键词规则已优于其余正则规则时跳过正则匹配
+        if self._regex_ranks and (best is None or self._regex_ranks[0] < best):
+            rank = self.__search_regex(text)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return self._rules[best].value if best is not None else None
+
+    def __search_regex(self, text: str) -> Optional[int]:
+        best = None
+        if self._regex is not None:
+            found = self._regex.match(text)
+            if found:
+                best = int(found.lastgroup[len(_GROUP_PREFIX):])
+        for compiled, rank in self._regex_list:
+            if best is not None and rank > best:
+                break
+            if compiled.search(text):
+                return rank
+        return best
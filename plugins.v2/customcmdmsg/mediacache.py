@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from app.log import logger
+from app.utils.http import RequestUtils
+
+
+class MediaCache:
+    """
+    图片本地缓存：按内容哈希存储于磁盘，总大小受限（LRU淘汰），
+    远程图片按ETag/Last-Modified重新验证，本地图片按mtime重新验证
+    """
+    # 索引文件名
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 50 * 1024 * 1024,
+                 revalidate_interval: int = 300, timeout: int = 15):
+        """
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存总大小上限
+        :param revalidate_interval: 远程图片两次重新验证的最小间隔（秒）
+        :param timeout: 下载超时（秒）
+        """
+        self._dir = cache_dir
+        self._max_bytes = max(1, max_bytes)
+        self._revalidate_interval = max(0, revalidate_interval)
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        # 图片来源 -> 缓存条目，按最近使用排序
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self.__load_index()
+
+    def resolve(self, source: Optional[str]) -> Optional[str]:
+        """
+        获取图片的本地缓存路径，失败时返回None
+        """
+        if not source:
+            return None
+        try:
+            if source.startswith(("http://", "https://")):
+                return self.__resolve_url(source)
+            return self.__resolve_file(source)
+        except Exception as e:
+            logger.warning(f"图片缓存失败：{source} - {e}")
+            return None
+
+    def __resolve_url(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self.__touch(url)
+            if entry and time.time() - entry["checked"] < self._revalidate_interval:
+                return entry["path"]
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        res = RequestUtils(headers=headers, timeout=self._timeout).get_res(url)
+        if res is None:
+            # 网络异常时继续使用旧缓存
+            return entry["path"] if entry else None
+        if res.status_code == 304 and entry:
+            with self._lock:
+                entry["checked"] = time.time()
+            return entry["path"]
+        if res.status_code != 200 or not res.content:
+            logger.warning(f"图片下载失败：{url} - {res.status_code}")
+            return entry["path"] if entry else None
+        return self.__store(url, res.content,
+                            etag=res.headers.get("ETag"),
+                            last_modified=res.headers.get("Last-Modified"))
+
+    def __resolve_file(self, path: str) -> Optional[str]:
+        stat = os.stat(path)
+        version = f"{stat.st_mtime_ns}-{stat.st_size}"
+        with self._lock:
+            entry = self.__touch(path)
+            if entry and entry.get("version") == version:
+                return entry["path"]
+        return self.__store(path, Path(path).read_bytes(), version=version)
+
+    def __store(self, source: str, content: bytes, **meta) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        # 保留原扩展名，便于渠道识别图片类型
+        suffix = Path(urlparse(source).path).suffix[:10]
+        blob = self._dir / f"{digest}{suffix}"
+        if not blob.exists():
+            tmp = self._dir / f"{digest}.{threading.get_ident()}.tmp"
+            tmp.write_bytes(content)
+            os.replace(tmp, blob)
+        with self._lock:
+            old = self._entries.pop(source, None)
+            self._entries[source] = dict(meta, digest=digest, path=str(blob),
+                                         size=len(content), checked=time.time())
+            if old and old["path"] != str(blob):
+                self.__release(old["path"])
+            self.__evict()
+            self.__save_index()
+        return str(blob)
+
+    def __touch(self, source: str) -> Optional[Dict]:
+        entry = self._entries.get(source)
+        if entry:
+            if not os.path.exists(entry["path"]):
+                # 缓存文件已被外部删除
+                self._entries.pop(source)
+                return None
+            self._entries.move_to_end(source)
+        return entry
+
+    def __evict(self):
+        """
+        按最近最少使用淘汰，直到总大小不超过上限，至少保留最近一条
+        """
+        blobs = {e["path"]: e["size"] for e in self._entries.values()}
+        total = sum(blobs.values())
+        while total > self._max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            if self.__release(entry["path"]):
+                total -= entry["size"]
+
+    def __release(self, path: str) -> bool:
+        """
+        没有其他来源引用时删除缓存文件
+        """
+        if any(e["path"] == path for e in self._entries.values()):
+            return False
+        try:
+            Path(path).unlink()
+        except FileNotFoundError:
+            pass
+        return True
+
+    def __load_index(self):
+        index = self._dir / self.INDEX_FILE
+        if not index.exists():
+            return
+        try:
+            entries = json.loads(index.read_text(encoding="utf-8"))
+            for source, entry in entries.items():
+                if os.path.exists(entry.get("path", "")):
+                    self._entries[source] = entry
+        except Exception as e:
+            logger.warning(f"图片缓存索引读取失败：{e}")
+
+    def __save_index(self):
+        index = self._dir / self.INDEX_FILE
+        tmp = index.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, index)
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with self._lock:
+            for entry in self._entries.values():
+                try:
+                    Path(entry["path"]).unlink()
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self.__save_index()
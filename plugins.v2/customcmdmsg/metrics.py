@@ -0,0 +1,92 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+# 延迟分桶上限（毫秒），最后一个桶收纳所有更大的值
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class LatencyHistogram:
+    """
+    固定分桶的延迟直方图
+    """
+    __slots__ = ("counts", "count", "errors", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms: float, error: bool = False):
+        self.counts[bisect_left(LATENCY_BUCKETS, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        if latency_ms > self.max_ms:
+            self.max_ms = latency_ms
+        if error:
+            self.errors += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        估算分位数，取所在分桶的上限，不超过实际最大值
+        """
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                bound = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max_ms
+                return round(min(bound, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class ReplyMetrics:
+    """
+    回复统计：按命令、按渠道计数，记录错误数与延迟分布
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._total = LatencyHistogram()
+        self._commands: Dict[str, LatencyHistogram] = {}
+        self._channels: Dict[str, LatencyHistogram] = {}
+
+    def record(self, command: str, channel: str, latency_ms: float, error: bool = False):
+        with self._lock:
+            self._total.record(latency_ms, error)
+            hist = self._commands.get(command)
+            if hist is None:
+                hist = self._commands[command] = LatencyHistogram()
+            hist.record(latency_ms, error)
+            hist = self._channels.get(channel)
+            if hist is None:
+                hist = self._channels[channel] = LatencyHistogram()
+            hist.record(latency_ms, error)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            uptime = max(time.time() - self._started, 1e-6)
+            return {
+                "uptime": round(uptime, 1),
+                "throughput": round(self._total.count / uptime, 4),
+                "total": self._total.summary(),
+                "commands": {k: v.summary() for k, v in self._commands.items()},
+                "channels": {k: v.summary() for k, v in self._channels.items()},
+            }
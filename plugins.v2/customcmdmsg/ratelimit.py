@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class DedupeWindow:
+    """
+    重复事件过滤：同一个键在时间窗口内只放行一次，容量固定
+    """
+
+    def __init__(self, window: float, capacity: int = 4096):
+        self._window = window
+        self._capacity = max(1, capacity)
+        # 键 -> 首次出现时间，按时间先后排序
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """
+        判断是否为重复事件，非重复时记录该键
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # 清理过期的键
+            while self._seen:
+                ts = next(iter(self._seen.values()))
+                if now - ts < self._window:
+                    break
+                self._seen.popitem(last=False)
+            if key in self._seen:
+                return True
+            self._seen[key] = now
+            if len(self._seen) > self._capacity:
+                self._seen.popitem(last=False)
+            return False
+
+    def __len__(self):
+        return len(self._seen)
+
+
+class TokenBucket:
+    """
+    令牌桶
+    """
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        """
+        :param rate: 每秒补充的令牌数
+        :param burst: 桶容量
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic() if now is None else now
+
+    def consume(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def idle_full(self, now: float) -> bool:
+        """
+        闲置时间已足够补满令牌
+        """
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """
+    按键限流：每个键一个令牌桶，桶数量固定，补满的桶会被清理
+    """
+
+    def __init__(self, rate: float, burst: float, capacity: int = 4096):
+        self._rate = rate
+        self._burst = burst
+        self._capacity = max(1, capacity)
+        # 键 -> 令牌桶，按最近使用排序
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self._rate, self._burst, now)
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+            allowed = bucket.consume(now)
+            # 清理已补满的闲置桶，超出容量时淘汰最久未用的桶
+            while self._buckets:
+                oldest = next(iter(self._buckets.values()))
+                if oldest is bucket:
+                    break
+                if len(self._buckets) <= self._capacity and not oldest.idle_full(now):
+                    break
+                self._buckets.popitem(last=False)
+            return allowed
+
+    def __len__(self):
+        return len(self._buckets)
@@ -0,0 +1,150 @@
+import heapq
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+
+@dataclass(frozen=True)
+class Schedule:
+    """
+    定时消息
+    """
+    # cron表达式
+    cron: str
+    # 要发送的回复，由调用方解释
+    key: Any
+    # 渠道 -> 用户列表，用户为None时发送给渠道的默认接收人
+    targets: Dict[Any, Tuple[Optional[str], ...]]
+
+
+class MessageScheduler:
+    """
+    定时消息调度：按下次触发时间维护最小堆，每分钟检查一次时只处理已到期的定时任务；
+    同一分钟内多个定时任务发给同一接收人时只发送一次，以先配置的定时任务为准
+    """
+
+    def __init__(self, send: Callable[[Any, Any, Optional[str]], None], grace: float = 300):
+        """
+        :param send: 发送回调，参数为 (回复, 渠道, 用户)
+        :param grace: 错过触发时间超过该秒数时不再补发
+        """
+        self._send = send
+        self._grace = grace
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._schedules: List[Schedule] = []
+        self._triggers: List[Any] = []
+        # (下次触发时间戳, 定时任务序号)
+        self._heap: List[Tuple[float, int]] = []
+        # 已发送的 (分钟, 渠道, 用户)
+        self._sent: Dict[Tuple[int, Any, Optional[str]], bool] = {}
+        self.fired = 0
+        self.coalesced = 0
+
+    def load(self, schedules: List[Schedule], now: Optional[datetime] = None) -> int:
+        """
+        加载定时任务并计算首次触发时间，cron表达式无效的任务将被忽略
+        :return: 有效的定时任务数量
+        """
+        from apscheduler.triggers.cron import CronTrigger
+
+        now = now or datetime.now().astimezone()
+        valid, triggers, heap = [], [], []
+        for schedule in schedules:
+            try:
+                trigger = CronTrigger.from_crontab(schedule.cron)
+            except ValueError as e:
+                logger.error(f"定时消息 cron 表达式 {schedule.cron} 无效：{e}")
+                continue
+            fire_time = trigger.get_next_fire_time(None, now)
+            if fire_time is None:
+                continue
+            heap.append((fire_time.timestamp(), len(valid)))
+            valid.append(schedule)
+            triggers.append(trigger)
+        heapq.heapify(heap)
+        with self._lock:
+            self._schedules, self._triggers, self._heap = valid, triggers, heap
+            self._sent.clear()
+        self._stop_event.clear()
+        return len(valid)
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """
+        发送已到期的定时消息，没有到期任务时只检查堆顶
+        :return: 发送的消息数
+        """
+        now = now or datetime.now().astimezone()
+        timestamp = now.timestamp()
+        due: List[int] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= timestamp:
+                fire_at, index = heapq.heappop(self._heap)
+                if timestamp - fire_at <= self._grace:
+                    due.append(index)
+                else:
+                    logger.warning(f"定时消息 {self._schedules[index].cron} 错过触发时间，已跳过")
+                # 下次触发时间，跳过已错过的时间
+                base = datetime.fromtimestamp(max(fire_at, timestamp)).astimezone() + timedelta(seconds=1)
+                next_time = self._triggers[index].get_next_fire_time(None, base)
+                if next_time:
+                    heapq.heappush(self._heap, (next_time.timestamp(), index))
+            if not due:
+                return 0
+            # 合并同一分钟内发给同一接收人的消息，先配置的定时任务优先
+            minute = int(timestamp // 60)
+            self._sent = {key: True for key in self._sent if key[0] >= minute - 1}
+            deliveries = []
+            for index in sorted(due):
+                schedule = self._schedules[index]
+                for channel, userids in schedule.targets.items():
+                    for userid in userids:
+                        key = (minute, channel, userid)
+                        if key in self._sent:
+                            self.coalesced += 1
+                            continue
+                        self._sent[key] = True
+                        deliveries.append((schedule.key, channel, userid))
+            self.fired += len(due)
+
+        sent = 0
+        for reply, channel, userid in deliveries:
+            if self._stop_event.is_set():
+                break
+            try:
+                self._send(reply, channel, userid)
+                sent += 1
+            except Exception as e:
+                logger.error(f"定时消息发送失败：{e}")
+        logger.info(f"{len(due)}个定时任务到期，发送{sent}条消息")
+        return sent
+
+    def next_run(self) -> Optional[datetime]:
+        """
+        最近一次触发时间
+        """
+        with self._lock:
+            return datetime.fromtimestamp(self._heap[0][0]).astimezone() if self._heap else None
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            next_times = {index: fire_at for fire_at, index in self._heap}
+            return {
+                "schedules": [{"cron": schedule.cron,
+                               "next": datetime.fromtimestamp(next_times[i]).astimezone().isoformat()
+                               if i in next_times else None}
+                              for i, schedule in enumerate(self._schedules)],
+                "fired": self.fired,
+                "coalesced": self.coalesced,
+            }
+
+    def stop(self):
+        """
+        停止调度，正在发送的定时消息不再继续发送
+        """
+        self._stop_event.set()
+        with self._lock:
+            self._heap = []
@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.log import logger
+
+from .filesource import FileSource
+
+
+class MessageTemplate:
+    """
+    预编译的消息模板，支持 {user}、{channel}、{source}、{date} 等占位符，
+    未知占位符原样保留；渲染结果按占位符取值做LRU缓存
+    """
+
+    def __init__(self, source: Optional[str], cache_size: int = 128):
+        self.source = source
+        # 编译后的片段：(文本, 占位符名, 格式, 原始占位符)
+        self._segments: List[Tuple[str, Optional[str], Optional[str], str]] = []
+        # 模板中引用的占位符
+        self.fields: Tuple[str, ...] = ()
+        self._cache: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._lock = threading.Lock()
+        self.__compile()
+
+    def __compile(self):
+        if not self.source:
+            return
+        try:
+            parsed = list(Formatter().parse(self.source))
+        except ValueError as e:
+            # 花括号不成对等情况按纯文本处理
+            logger.warning(f"消息模板解析失败，按纯文本处理：{e}")
+            return
+        fields = []
+        for literal, name, spec, conversion in parsed:
+            if name is None:
+                self._segments.append((literal, None, None, ""))
+                continue
+            raw = "{" + name + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}"
+            self._segments.append((literal, name, spec, raw))
+            if name not in fields:
+                fields.append(name)
+        self.fields = tuple(fields)
+
+    @property
+    def static(self) -> bool:
+        """
+        是否为不含占位符的静态文本
+        """
+        return not self.fields
+
+    def render(self, variables: Dict[str, Any]) -> Optional[str]:
+        """
+        使用变量渲染模板
+        """
+        if self.static:
+            return self.source
+        key = tuple(variables.get(name) for name in self.fields)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                return text
+        parts = []
+        for literal, name, spec, raw in self._segments:
+            parts.append(literal)
+            if name is None:
+                continue
+            if name in variables:
+                try:
+                    parts.append(format(variables[name], spec or ""))
+                    continue
+                except (TypeError, ValueError):
+                    pass
+            parts.append(raw)
+        text = "".join(parts)
+        with self._lock:
+            self._cache[key] = text
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+
+class FileTemplate:
+    """
+    内容来自本地文件的消息模板，文件变化时重新编译
+    """
+
+    def __init__(self, source: FileSource, cache_size: int = 128):
+        self.file = source
+        self._cache_size = cache_size
+        self._version = -1
+        self._template = MessageTemplate(None)
+
+    def __current(self) -> MessageTemplate:
+        content = self.file.read()
+        if self.file.version != self._version:
+            self._template = MessageTemplate(content, cache_size=self._cache_size)
+            self._version = self.file.version
+        return self._template
+
+    @property
+    def static(self) -> bool:
+        return self.__current().static
+
+    def render(self, variables: Dict[str, Any]) -> Optional[str]:
+        return self.__current().render(variables)
+
+
+def compile_template(source: Optional[str]) -> Union[MessageTemplate, FileTemplate]:
+    """
+    编译消息模板，以 file:// 开头时从本地文件读取内容
+    """
+    if FileSource.is_file_source(source):
+        return FileTemplate(FileSource.from_value(source))
+    return MessageTemplate(source)